@@ -6,16 +6,62 @@ v2: parse_steps soporta respuestas JSON además del formato texto original.
 """
 import atexit
 import asyncio
+import functools
 import json
+import os
 import re
 import threading
 from typing import Any
 
-from core.browser import BrowserSession, AI_SITES, check_playwright, install_playwright, C
+from core import llm_cache, semantic_cache
+from core.browser import BrowserSession, AI_SITES, check_playwright, install_playwright
+from core.browser import log, flush_log, LOG_INFO, LOG_ERR
+from core.browser import _SESSION_POOL, _POOL_LOCK, _START_LOCKS, get_session
 from core.web_log  import log_prompt, log_response, log_error
 
+# orjson (opcional) parsea las respuestas JSON grandes bastante más rápido;
+# sus errores heredan de json.JSONDecodeError, así que los except no cambian.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# re2 (opcional, pip install pyre2): motor DFA sin backtracking para los
+# patrones que recorren respuestas enteras. Sin él, todo sigue con re.
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+
+def _compile_dfa(pattern: str, flags: int = 0):
+    """re2 si está instalado y acepta el patrón/flags; si no, re."""
+    if re2 is not None:
+        try:
+            return re2.compile(pattern, flags)
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
+
+
 SITE_PRIORITY = ["claude", "chatgpt", "gemini", "qwen"]
-_PERSISTENT_SESSIONS: dict[str, BrowserSession] = {}
+# Tope de pasos que se extraen de una respuesta para ejecutar
+MAX_STEPS = 50
+# Sitios consultados a la vez cuando no hay IA preferida. 1 = secuencial (por
+# defecto): el fan-out abre un navegador por sitio y es opt-in vía env.
+try:
+    MAX_PARALLEL_SITES = max(1, int((os.environ.get("SONNY_PARALLEL_SITES") or "1").strip()))
+except ValueError:
+    MAX_PARALLEL_SITES = 1
+# El mismo dict que el pool de core.browser: una sola sesión por sitio
+_PERSISTENT_SESSIONS: dict[str, BrowserSession] = _SESSION_POOL
+# Una sesión no es reentrante: un lock por sitio serializa su uso concurrente
+_SESSION_LOCKS: dict[str, asyncio.Lock] = {}
+# Turnos de sitios que perdieron el fan-out: terminan en segundo plano (con
+# su lock tomado) para no dejar la conversación a medias. Referencia fuerte
+# para que el GC no los recoja antes de acabar.
+_BACKGROUND_TURNS: set[asyncio.Task] = set()
 
 ARTIFACT_TEXT_MIME_PREFIXES = ("text/",)
 ARTIFACT_TEXT_MIME_EXACT = {
@@ -26,6 +72,16 @@ ARTIFACT_TEXT_MIME_EXACT = {
     "application/yaml",
     "application/csv",
 }
+# Únicos MIME cuyo content estructurado (dict/list) puede traer comandos
+# en sus valores; el resto de artifacts no-texto se ignoran sin recorrerlos
+ARTIFACT_SCRIPT_MIME = {
+    "application/json",
+    "application/javascript",
+    "application/x-sh",
+    "application/x-shellscript",
+    "text/x-shellscript",
+    "text/x-sh",
+}
 ARTIFACT_ARCHIVE_MIME = {
     "application/zip",
     "application/x-zip-compressed",
@@ -39,6 +95,27 @@ _CONTAMINATED_RESPONSE_MARKERS = (
     "Dame pasos corregidos en formato PASO/CMD/FILE",
 )
 
+# Filtros compartidos por los parsers de pasos (constantes de módulo, no por llamada)
+_SKIP_CMDS = ("ng serve", "npm start", "npm run dev", "cd ", "node -v", "npm -v")
+_CMD_STARTS = ("npm ", "npx ", "ng ", "pip ", "python ", "node ", "mkdir ", "git ")
+# Prefijos de comando agrupados por primer carácter: un dict lookup descarta
+# casi todas las líneas antes de probar startswith.
+_BY_FIRST: dict[str, tuple[str, ...]] = {}
+for _p in _CMD_STARTS:
+    _BY_FIRST[_p[0]] = _BY_FIRST.get(_p[0], ()) + (_p,)
+del _p
+_NUM_SEPARATORS = ".):-" + " \t\n\r\f\v\xa0"
+_SKIP_LINE_PREFIXES = ("ng serve", "npm start", "npm run ", "cd ", "node -v", "npm -v")
+_FENCE_OPEN_RE  = _compile_dfa(r'^```(?:json)?\s*', re.MULTILINE)
+_FENCE_CLOSE_RE = _compile_dfa(r'```\s*$', re.MULTILINE)
+_JSON_OBJECT_RE = _compile_dfa(r'\{.*\}', re.DOTALL)
+_ISOLATED_SEGMENT_RE = _compile_dfa(r'\n?\s*Isolated Segment\s*\n\s*\(function\(\)\{.*?\}\)\(\);?', re.DOTALL)
+_CF_PARAMS_RE        = _compile_dfa(r'window\.__CF\$cv\$params=.*?appendChild\(a\);', re.DOTALL)
+# Alias aceptados por campo en las respuestas JSON (la IA no siempre usa "cmd")
+_STEPS_KEYS = ("steps", "pasos")
+_CMD_KEYS   = ("cmd", "command", "comando")
+_NONE_CMDS  = frozenset(("ninguno", "none", "n/a", "null"))
+
 # Runtime async persistente en hilo aparte para no romper objetos Playwright
 # entre múltiples llamadas síncronas a ask_ai_multiturn().
 _RUNTIME_LOOP: asyncio.AbstractEventLoop | None = None
@@ -46,25 +123,27 @@ _RUNTIME_THREAD: threading.Thread | None = None
 _RUNTIME_LOCK = threading.Lock()
 
 
-def parse_steps(response: str) -> list[dict]:
+def parse_steps(response: str, max_steps: int | None = None) -> list[dict]:
     """
     Extrae pasos de la respuesta de la IA.
     Soporta dos formatos:
       1. JSON (formato preferido): {"steps": [{"description":..., "cmd":..., "files":[...]}]}
       2. Texto con comandos (fallback): líneas que empiezan con npm/ng/pip/etc.
+    Con max_steps, el parser de texto corta en cuanto reúne ese número de pasos
+    (las respuestas suelen traer mucha prosa después de los comandos).
     """
     # Intento 0: artifacts de Claude serializados como JSON dentro del texto
     artifact_steps = _parse_steps_from_artifacts(response)
     if artifact_steps:
-        return artifact_steps
+        return artifact_steps[:max_steps]
 
     # Intento 1: JSON
     json_steps = _parse_steps_json(response)
     if json_steps is not None:
-        return json_steps
+        return json_steps[:max_steps]
 
     # Fallback: parseo de texto con comandos
-    return _parse_steps_text(response)
+    return _parse_steps_text(response, max_steps)
 
 
 def _looks_like_text_mime(mime: str) -> bool:
@@ -113,6 +192,18 @@ def _walk_artifact_objects(node: Any) -> list[dict[str, Any]]:
     return found
 
 
+def _iter_str_leaves(node: Any):
+    """Recorre dict/list y produce solo los valores str (hojas)."""
+    if isinstance(node, str):
+        yield node
+    elif isinstance(node, dict):
+        for v in node.values():
+            yield from _iter_str_leaves(v)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _iter_str_leaves(item)
+
+
 def _parse_steps_from_artifacts(response: str) -> list[dict]:
     """
     Extrae comandos desde artifacts serializados en JSON.
@@ -124,12 +215,12 @@ def _parse_steps_from_artifacts(response: str) -> list[dict]:
 
     parsed: Any = None
     try:
-        parsed = json.loads(clean)
+        parsed = _json_loads(clean)
     except json.JSONDecodeError:
-        m = re.search(r'\{.*\}', clean, re.DOTALL)
+        m = _JSON_OBJECT_RE.search(clean)
         if m:
             try:
-                parsed = json.loads(m.group())
+                parsed = _json_loads(m.group())
             except json.JSONDecodeError:
                 return []
         else:
@@ -158,9 +249,12 @@ def _parse_steps_from_artifacts(response: str) -> list[dict]:
             continue
 
         if not isinstance(content, str):
-            try:
-                content = json.dumps(content, ensure_ascii=False)
-            except Exception:
+            # dict/list: solo en MIME de script/JSON puede haber comandos, y
+            # solo en sus hojas str; no serializar todo el JSON
+            if mime not in ARTIFACT_SCRIPT_MIME:
+                continue
+            content = "\n".join(_iter_str_leaves(content))
+            if not content:
                 continue
 
         content_commands = _parse_steps_text(content)
@@ -180,80 +274,111 @@ def _parse_steps_from_artifacts(response: str) -> list[dict]:
     return commands
 
 
+def _first(d: dict, keys: tuple) -> str:
+    """Primer valor str no vacío entre los alias de un campo, ya strip()eado ("" si no hay)."""
+    for k in keys:
+        v = d.get(k)
+        # Un alias con otro tipo (dict, número…) no corta la búsqueda
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    return ""
+
+
 def _parse_steps_json(response: str) -> list[dict] | None:
     """Intenta extraer steps de una respuesta JSON."""
     clean = response.strip()
     # Quitar backticks de markdown
-    clean = re.sub(r'^```(?:json)?\s*', '', clean, flags=re.MULTILINE)
-    clean = re.sub(r'```\s*$', '', clean, flags=re.MULTILINE)
+    clean = _FENCE_OPEN_RE.sub('', clean)
+    clean = _FENCE_CLOSE_RE.sub('', clean)
     clean = clean.strip()
 
     # Intentar parsear directamente
     data = None
     try:
-        data = json.loads(clean)
+        data = _json_loads(clean)
     except json.JSONDecodeError:
         # Buscar JSON embebido en texto
-        match = re.search(r'\{.*\}', clean, re.DOTALL)
+        match = _JSON_OBJECT_RE.search(clean)
         if match:
             try:
-                data = json.loads(match.group())
+                data = _json_loads(match.group())
             except json.JSONDecodeError:
                 pass
 
     if not data:
         return None
 
-    steps_raw = data.get("steps", [])
+    if not isinstance(data, dict):
+        return None
+
+    steps_raw = next((data[k] for k in _STEPS_KEYS if data.get(k)), [])
     if not steps_raw:
         # Si el JSON tiene cmd/files directamente (sin wrapper "steps")
-        if "cmd" in data or "files" in data:
+        if "files" in data or any(k in data for k in _CMD_KEYS):
             steps_raw = [data]
         else:
             return None
 
     result = []
-    SKIP_CMDS = ("ng serve", "npm start", "npm run dev", "cd ", "node -v", "npm -v")
+    result_append = result.append
+    # La IA a veces repite instrucciones: no re-ejecutar el mismo comando
+    seen_cmd: set[str] = set()
 
     for s in steps_raw:
         if not isinstance(s, dict):
             continue
-        cmd = s.get("cmd") or None
-        if cmd and isinstance(cmd, str):
-            cmd = cmd.strip()
-            if not cmd or cmd.upper() in ("NINGUNO", "NONE", "N/A", "NULL"):
-                cmd = None
-        # Filtrar comandos de desarrollo/arranque
-        if cmd and any(cmd.lower().startswith(sk) for sk in SKIP_CMDS):
-            cmd = None
+        cmd = _first(s, _CMD_KEYS)
+        if not cmd:
+            continue
+        # Una sola minúscula por comando, reutilizada en todos los filtros
+        cmd_key = cmd.lower()
+        # Filtrar marcadores vacíos y comandos de desarrollo/arranque
+        if cmd_key in _NONE_CMDS or cmd_key.startswith(_SKIP_CMDS) or cmd_key in seen_cmd:
+            continue
+        seen_cmd.add(cmd_key)
 
         # Convertir a formato "cmd" simple para compatibilidad
-        if cmd:
-            result.append({"type": "cmd", "value": cmd})
+        result_append({"type": "cmd", "value": cmd})
 
     return result if result else None
 
 
-def _parse_steps_text(response: str) -> list[dict]:
+def _strip_numbering(s: str) -> str:
+    """
+    Quita la numeración inicial ("1. ", "2) ", "10 - ") sin pasar por el motor
+    de regex. Equivale a re.sub(r'^\d+[.):\-\s]+', '', s) para dígitos ASCII.
+    """
+    if not s[:1].isdigit():
+        return s
+    # Camino rápido: dos lstrip en C en vez de recorrer la línea en Python
+    rest = s.lstrip("0123456789")
+    body = rest.lstrip(_NUM_SEPARATORS)
+    return body if len(body) < len(rest) else s
+
+
+def _parse_steps_text(response: str, max_steps: int | None = None) -> list[dict]:
     """Parser de texto original — extrae comandos de líneas de texto."""
     steps, seen = [], set()
-    CMD_STARTS = ("npm ","npx ","ng ","pip ","python ","node ","mkdir ","git ")
-    SKIP = ("ng serve","npm start","npm run ","cd ","node -v","npm -v")
+    # Pre-bind de métodos usados en cada línea (evita LOAD_ATTR en el bucle)
+    seen_add, steps_append, by_first = seen.add, steps.append, _BY_FIRST
     for line in response.splitlines():
-        line = re.sub(r'^[\d]+[.):\-\s]+','',line.strip()).lstrip('`$>').strip()
+        line = _strip_numbering(line.strip()).lstrip('`$>').strip()
         if len(line) < 5: continue
-        if any(line.lower().startswith(s) for s in SKIP): continue
-        if any(line.startswith(s) for s in CMD_STARTS) and line not in seen:
-            seen.add(line)
-            steps.append({"type":"cmd","value":line})
+        # str.startswith(tuple): una sola llamada en C por línea
+        if line.lower().startswith(_SKIP_LINE_PREFIXES): continue
+        cands = by_first.get(line[0])
+        if cands and line.startswith(cands) and line not in seen:
+            seen_add(line)
+            steps_append({"type":"cmd","value":line})
+            if max_steps and len(steps) >= max_steps: break
     return steps
 
 
 def _strip_isolated_segments(text: str) -> str:
     """Elimina ruido de Cloudflare/iframes que a veces queda pegado al copiar DOM."""
     clean = text or ""
-    clean = re.sub(r'\n?\s*Isolated Segment\s*\n\s*\(function\(\)\{.*?\}\)\(\);?', '', clean, flags=re.DOTALL)
-    clean = re.sub(r'window\.__CF\$cv\$params=.*?appendChild\(a\);', '', clean, flags=re.DOTALL)
+    clean = _ISOLATED_SEGMENT_RE.sub('', clean)
+    clean = _CF_PARAMS_RE.sub('', clean)
     return clean.strip()
 
 
@@ -285,6 +410,22 @@ def _sanitize_response_for_execution(response: str, prompt: str) -> str:
     return clean
 
 
+def _warm_playwright():
+    """Importa playwright.async_api en segundo plano: el primer import cuesta cientos de ms."""
+    try:
+        if check_playwright():
+            import playwright.async_api  # noqa: F401
+    except Exception:
+        pass
+    finally:
+        _PLAYWRIGHT_READY.set()
+
+
+# Precalentamiento en paralelo con la construcción del primer prompt
+_PLAYWRIGHT_READY = threading.Event()
+threading.Thread(target=_warm_playwright, name="sonny-playwright-warmup", daemon=True).start()
+
+
 def _runtime_loop_worker(loop: asyncio.AbstractEventLoop):
     asyncio.set_event_loop(loop)
     loop.run_forever()
@@ -310,12 +451,34 @@ def _ensure_runtime_loop() -> asyncio.AbstractEventLoop:
 
 
 async def _close_all_sessions_async():
-    for key, session in list(_PERSISTENT_SESSIONS.items()):
+    async def _close(key: str, session: BrowserSession):
         try:
-            await session.close()
+            # shield: una cancelación del apagado no corta el close() a medias
+            await asyncio.shield(session.close())
         except Exception as e:
             log_error(AI_SITES.get(key, {}).get("name", key), f"close_session: {e}")
-    _PERSISTENT_SESSIONS.clear()
+
+    # Perdedores del fan-out aún en curso: cortarlos antes de cerrar sus sesiones
+    for task in list(_BACKGROUND_TURNS):
+        task.cancel()
+    if _BACKGROUND_TURNS:
+        await asyncio.gather(*_BACKGROUND_TURNS, return_exceptions=True)
+
+    # En paralelo: el apagado tarda lo que la sesión más lenta, no la suma
+    async with asyncio.TaskGroup() as tg:
+        for key, session in list(_PERSISTENT_SESSIONS.items()):
+            tg.create_task(_close(key, session))
+    with _POOL_LOCK:
+        _PERSISTENT_SESSIONS.clear()
+        _START_LOCKS.clear()
+    _SESSION_LOCKS.clear()
+
+
+def _site_lock(site_key: str) -> asyncio.Lock:
+    lock = _SESSION_LOCKS.get(site_key)
+    if lock is None:
+        lock = _SESSION_LOCKS[site_key] = asyncio.Lock()
+    return lock
 
 
 def _shutdown_runtime_loop():
@@ -351,86 +514,266 @@ def shutdown_ai_scraper_runtime():
     _shutdown_runtime_loop()
 
 
-async def _run_multiturn(prompts: list[str], site_key: str, objetivo: str) -> list[str]:
-    """
-    Una sesión del navegador, todos los prompts en secuencia.
-    """
-    site_name = AI_SITES[site_key]["name"]
-    responses = []
+def _background_turn_done(site_key: str, task: asyncio.Task):
+    """Callback de un perdedor del fan-out: soltar la referencia y loguear su error."""
+    _BACKGROUND_TURNS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log_error(AI_SITES[site_key]["name"], str(task.exception()))
 
-    session = _PERSISTENT_SESSIONS.get(site_key)
+
+async def _discard_session(site_key: str):
+    """Saca la sesión del pool y la cierra; la próxima llamada arranca una nueva."""
+    session = _PERSISTENT_SESSIONS.pop(site_key, None)
     if session is None:
-        session = BrowserSession(site_key)
-        _PERSISTENT_SESSIONS[site_key] = session
+        return
+    try:
+        await session.close()
+    except Exception as e:
+        log_error(AI_SITES.get(site_key, {}).get("name", site_key), f"close_session: {e}")
 
+
+async def _get_session(site_key: str) -> BrowserSession:
+    """
+    Reutiliza la sesión persistente: el arranque del navegador solo se paga
+    la primera vez (start() es no-op si ya está iniciada).
+    """
     try:
-        await session.start()
+        return await get_session(site_key)
     except Exception:
-        # Si la sesión quedó en mal estado, recrearla
-        session = BrowserSession(site_key)
-        _PERSISTENT_SESSIONS[site_key] = session
-        await session.start()
+        # Si la sesión quedó en mal estado, cerrarla y recrearla
+        await _discard_session(site_key)
+        try:
+            return await get_session(site_key)
+        except Exception:
+            await _discard_session(site_key)
+            raise
+
+
+async def _run_multiturn(prompts: list[str], site_key: str, objetivo: str,
+                         semantic_keys: list | None = None) -> list[str]:
+    """
+    Una sesión del navegador, todos los prompts en secuencia.
+    """
+    async with _site_lock(site_key):
+        return await _run_session_turns(prompts, site_key, objetivo, semantic_keys)
+
+
+async def _run_session_turns(prompts: list[str], site_key: str, objetivo: str,
+                             semantic_keys: list | None = None) -> list[str]:
+    site_name = AI_SITES[site_key]["name"]
+    # Longitud conocida de antemano: reservar la lista completa
+    responses = [""] * len(prompts)
+
+    session = await _get_session(site_key)
 
     for idx, prompt in enumerate(prompts, 1):
-        print(f"  [Turno {idx}/{len(prompts)}] Enviando...", flush=True)
+        log.info("  [Turno %d/%d] Enviando...", idx, len(prompts))
         log_prompt(site_name, objetivo, prompt)
 
         try:
             resp = await session.send_prompt(prompt)
         except Exception:
             # Si el usuario cerró manualmente la ventana, relanzar una sola vez
-            fresh = BrowserSession(site_key)
-            _PERSISTENT_SESSIONS[site_key] = fresh
-            await fresh.start()
-            session = fresh
-            resp = await session.send_prompt(prompt)
+            await _discard_session(site_key)
+            try:
+                session = await get_session(site_key)
+                resp = await session.send_prompt(prompt)
+            except Exception:
+                await _discard_session(site_key)
+                raise
 
-        clean_resp = _sanitize_response_for_execution(resp or "", prompt)
-        if not clean_resp or len(clean_resp) < 20:
-            reason = "respuesta vacía" if not (resp or "").strip() else "respuesta inválida/contaminada"
-            log_error(site_name, f"Turno {idx}: {reason}")
-            print(f"  ⚠️  Turno {idx}: sin respuesta usable", flush=True)
-            responses.append("")
-        else:
-            log_response(site_name, clean_resp, len(parse_steps(clean_resp)))
-            print(f"  ✅ Turno {idx}: {len(clean_resp)} chars", flush=True)
-            responses.append(clean_resp)
+        responses[idx - 1] = await _accept_response(
+            site_key, idx, prompt, resp, semantic_keys[idx - 1] if semantic_keys else None)
 
     return responses
 
 
-async def _multiturn_async(prompts: list[str], preferred_site: str = None,
-                           objetivo: str = "") -> tuple[str, list[str]]:
-    if not check_playwright():
-        install_playwright()
+async def _accept_response(site_key: str, idx: int, prompt: str, resp: str,
+                           key: tuple | None) -> str:
+    """Sanea, registra y guarda en caché la respuesta de un turno; "" si no es usable."""
+    site_name  = AI_SITES[site_key]["name"]
+    clean_resp = _sanitize_response_for_execution(resp or "", prompt)
+    if not clean_resp or len(clean_resp) < 20:
+        reason = "respuesta vacía" if not (resp or "").strip() else "respuesta inválida/contaminada"
+        log_error(site_name, f"Turno {idx}: {reason}")
+        log.info("  ⚠️  Turno %d: sin respuesta usable", idx)
+        return ""
+    # Parseo fuera del loop: respuestas grandes no bloquean otras sesiones
+    steps_count = await asyncio.to_thread(lambda: len(parse_steps(clean_resp)))
+    log_response(site_name, clean_resp, steps_count)
+    log.info("  ✅ Turno %d: %d chars", idx, len(clean_resp))
+    # Escritura en disco fuera del loop del scraper
+    await asyncio.to_thread(llm_cache.cache_set, prompt, clean_resp, site_key)
+    if key and semantic_cache.is_configured():
+        kind, text = key
+        await asyncio.to_thread(semantic_cache.semantic_set, text, clean_resp, site_key, kind)
+    return clean_resp
+
+
+async def _run_parallel(prompts: list[str], site_key: str, objetivo: str,
+                        semantic_keys: list | None = None) -> list[str]:
+    """
+    Cada prompt en su propia pestaña del sitio (conversación nueva, mismo
+    login), todos a la vez: tardan max(t_i) en vez de sum(t_i). Con el lock
+    del sitio tomado, para que nadie cierre la sesión dueña a mitad.
+    """
+    site_name = AI_SITES[site_key]["name"]
+
+    async def _one(session: BrowserSession, idx: int, prompt: str) -> str:
+        log.info("  [Turno %d/%d] Enviando en pestaña nueva...", idx, len(prompts))
+        log_prompt(site_name, objetivo, prompt)
+        tab = await session.open_tab()
+        try:
+            resp = await tab.send_prompt(prompt)
+        finally:
+            await tab.close()
+        return await _accept_response(
+            site_key, idx, prompt, resp, semantic_keys[idx - 1] if semantic_keys else None)
+
+    async with _site_lock(site_key):
+        session = await _get_session(site_key)
+        results = await asyncio.gather(*(_one(session, i, p) for i, p in enumerate(prompts, 1)),
+                                       return_exceptions=True)
+    responses = []
+    for idx, r in enumerate(results, 1):
+        if isinstance(r, BaseException):
+            log_error(site_name, f"Turno {idx}: {r}")
+            r = ""
+        responses.append(r)
+    return responses
+
+
+def _cached_responses(prompts: list[str], sites: list[str],
+                      semantic_keys: list | None = None) -> tuple[str, list[dict]] | None:
+    """
+    Primer sitio (en orden de preferencia) con respuesta en caché para todos
+    los prompts: primero hash exacto, luego caché semántica si está activa y
+    el prompt trae clave semántica. Hace E/S de disco: llamar con
+    asyncio.to_thread.
+    """
+    keys = semantic_keys or [None] * len(prompts)
+    for site_key in sites:
+        hits = []
+        for p, key in zip(prompts, keys):
+            hit = llm_cache.cache_get(p, site_key)
+            if hit is None and key and semantic_cache.is_configured():
+                kind, text = key
+                hit = semantic_cache.semantic_get(text, site_key, kind)
+            if hit is None:
+                break
+            hits.append(hit)
+        else:
+            return site_key, hits
+    return None
+
 
+async def _multiturn_async(prompts: list[str], preferred_site: str = None,
+                           objetivo: str = "",
+                           max_parallel: int = MAX_PARALLEL_SITES,
+                           use_cache: bool = True,
+                           semantic_keys: list | None = None,
+                           parallel: bool = False) -> tuple[str, list[str]]:
     if preferred_site and preferred_site in AI_SITES:
         # Si el usuario eligió una IA concreta, no hacer fallback automático.
         sites = [preferred_site]
     else:
         sites = list(SITE_PRIORITY)
 
-    for site_key in sites:
-        site_name = AI_SITES[site_key]["name"]
-        print(f"\n  {C.CYAN}🌐 Conectando con {site_name}...{C.RESET}", flush=True)
-        try:
-            responses = await _run_multiturn(prompts, site_key, objetivo)
-            if any(r for r in responses):
-                return site_key, responses
-        except Exception as e:
-            log_error(AI_SITES[site_key]["name"], str(e))
-            print(f"  {C.RED}❌ {site_name} falló: {e}{C.RESET}", flush=True)
+    # Si todos los prompts ya tienen respuesta en caché (de uno de los sitios
+    # admitidos), no abrir el navegador. use_cache=False en correcciones y
+    # reintentos: repetir la respuesta guardada repetiría el mismo fallo.
+    if use_cache:
+        cached = await asyncio.to_thread(_cached_responses, prompts, sites, semantic_keys)
+        if cached:
+            site_key, hits = cached
+            log.info("\n  💾 %d respuesta(s) desde caché local", len(hits), extra=LOG_INFO)
+            return site_key, [h["resp"] for h in hits]
+
+    if not _PLAYWRIGHT_READY.is_set():
+        await asyncio.to_thread(_PLAYWRIGHT_READY.wait, 5)
+    if not check_playwright():
+        # pip + descarga de Chromium: subprocesos de minutos, fuera del loop
+        await asyncio.to_thread(install_playwright)
+
+    # Fan-out (opt-in, max_parallel > 1): hasta max_parallel sitios a la vez;
+    # gana el primero con respuesta usable. La latencia queda acotada por la
+    # IA más rápida en vez de por la suma de timeouts.
+    pending = list(sites)
+    running: dict[asyncio.Task, str] = {}
+    run     = _run_parallel if parallel and len(prompts) > 1 else _run_multiturn
+
+    def _launch():
+        while pending and len(running) < max(1, max_parallel):
+            site_key = pending.pop(0)
+            log.info("\n  🌐 Conectando con %s...", AI_SITES[site_key]["name"], extra=LOG_INFO)
+            task = asyncio.create_task(run(prompts, site_key, objetivo, semantic_keys))
+            running[task] = site_key
+
+    _launch()
+    try:
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                site_key  = running.pop(task)
+                site_name = AI_SITES[site_key]["name"]
+                try:
+                    responses = task.result()
+                except Exception as e:
+                    log_error(site_name, str(e))
+                    log.info("  ❌ %s falló: %s", site_name, e, extra=LOG_ERR)
+                    continue
+                if any(r for r in responses):
+                    return site_key, responses
+            _launch()
+    finally:
+        # Los perdedores no se cancelan: cortarlos a mitad de send_prompt
+        # dejaría la pestaña con un prompt a medio pegar y obligaría a cerrar
+        # el navegador (y su login). Terminan en segundo plano con el lock del
+        # sitio tomado, así el próximo turno a ese sitio espera a que acaben.
+        for task, site_key in running.items():
+            _BACKGROUND_TURNS.add(task)
+            task.add_done_callback(functools.partial(_background_turn_done, site_key))
 
     raise RuntimeError("Ninguna IA web estuvo disponible.")
 
 
-def ask_ai_multiturn(prompts: list[str], preferred_site: str = None,
-                     objetivo: str = "") -> tuple[str, list[str]]:
+def _run_on_runtime(coro):
+    """
+    Ejecuta la corrutina en el loop persistente y espera el resultado.
+    Nunca se usa asyncio.run(): crear/destruir un loop por llamada invalida
+    las sesiones de Playwright guardadas en _PERSISTENT_SESSIONS.
+    """
     loop = _ensure_runtime_loop()
-    future = asyncio.run_coroutine_threadsafe(
-        _multiturn_async(prompts, preferred_site, objetivo), loop
-    )
-    return future.result()
+    if threading.current_thread() is _RUNTIME_THREAD:
+        coro.close()
+        raise RuntimeError("Llamada síncrona desde el loop del scraper: usar la API async.")
+    try:
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    finally:
+        # El progreso del scraper va por una cola: que esté en pantalla antes
+        # de que el llamador vuelva a imprimir
+        flush_log()
+
+
+def ask_ai_multiturn(prompts: list[str], preferred_site: str = None,
+                     objetivo: str = "",
+                     use_cache: bool = True,
+                     semantic_keys: list | None = None,
+                     parallel: bool = False) -> tuple[str, list[str]]:
+    """
+    Los prompts van en secuencia en una misma conversación por sitio.
+    parallel=True: solo para prompts independientes entre sí; cada uno va a
+    una pestaña nueva (conversación propia) del mismo sitio, todos a la vez.
+    use_cache=False: no reutilizar respuestas guardadas (correcciones y
+    reintentos, donde la respuesta anterior ya no sirvió).
+    semantic_keys: por prompt, (kind, texto variable) para la caché semántica
+    o None; sin clave, el prompt solo usa la caché exacta (ver
+    core/semantic_cache.py).
+    """
+    return _run_on_runtime(_multiturn_async(prompts, preferred_site, objetivo,
+                                            use_cache=use_cache,
+                                            semantic_keys=semantic_keys,
+                                            parallel=parallel))
 
 
 # Compatibilidad
@@ -440,6 +783,9 @@ def ask_ai_web_multiturn(prompts, preferred_site=None, objetivo=""):
 
 def ask_ai_web_sync(objetivo, preferred_site=None, raw_prompt=None):
     prompt = raw_prompt if raw_prompt else objetivo
-    _, responses = ask_ai_multiturn([prompt], preferred_site, objetivo)
+    # Sin raw_prompt el prompt es el objetivo tal cual: entero es la parte variable
+    keys = None if raw_prompt else [("objetivo", objetivo)]
+    _, responses = _run_on_runtime(_multiturn_async([prompt], preferred_site, objetivo,
+                                                    semantic_keys=keys))
     resp = responses[0] if responses else ""
-    return resp, parse_steps(resp)
+    return resp, parse_steps(resp, max_steps=MAX_STEPS)
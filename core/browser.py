@@ -41,14 +41,64 @@ FIX 5 — CHATGPT: SELECTOR [class*="action"] DEMASIADO AMPLIO (v10):
     · Bajar umbral de detección de `len > 40` a `len > 3`.
     · Aumentar paciencia de `no_text_count >= 12` a `>= 20`.
 """
-import asyncio, os, sys, time, re
-import pyperclip
+import asyncio, atexit, functools, json, logging, logging.handlers, os, queue, random, shutil
+import sys, textwrap, threading
 from pathlib import Path
+from urllib.parse import urlsplit
 
 class C:
     CYAN="\033[96m"; GREEN="\033[92m"; YELLOW="\033[93m"
     RED="\033[91m";  BOLD="\033[1m";   DIM="\033[2m"; RESET="\033[0m"
 
+# ── Salida de consola ─────────────────────────────────────────────────────────
+# El progreso de este módulo y de core.ai_scraper va al logger "sonny.ai": el
+# loop del navegador solo encola y un hilo aparte escribe en stdout (en
+# Windows cmd cada print síncrono puede costar milisegundos). El color va en
+# extra= (LOG_OK, LOG_WARN…) y solo se aplica si stdout es una terminal.
+LOG_DIM  = {"color": C.DIM}
+LOG_INFO = {"color": C.CYAN}
+LOG_OK   = {"color": C.GREEN}
+LOG_WARN = {"color": C.YELLOW}
+LOG_ERR  = {"color": C.RED}
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    _tty = sys.stdout.isatty()
+
+    def emit(self, record):
+        # Marca de flush_log(): avisar en vez de escribir
+        flushed = getattr(record, "flushed", None)
+        if flushed is not None:
+            flushed.set()
+            return
+        super().emit(record)
+
+    def format(self, record):
+        msg   = super().format(record)
+        color = getattr(record, "color", "")
+        return f"{color}{msg}{C.RESET}" if color and self._tty else msg
+
+
+log = logging.getLogger("sonny.ai")
+log.setLevel(logging.INFO)
+log.propagate = False
+_LOG_QUEUE: queue.SimpleQueue = queue.SimpleQueue()
+log.addHandler(logging.handlers.QueueHandler(_LOG_QUEUE))
+_LOG_LISTENER = logging.handlers.QueueListener(_LOG_QUEUE, _ConsoleHandler(sys.stdout))
+_LOG_LISTENER.start()
+atexit.register(_LOG_LISTENER.stop)
+
+
+def flush_log(timeout: float = 1.0) -> None:
+    """
+    Espera a que el hilo de consola escriba todo lo encolado hasta ahora.
+    El código síncrono la llama antes de devolver el control, para que su
+    propia salida (print) no se adelante a la del scraper.
+    """
+    done = threading.Event()
+    log.info("", extra={"flushed": done})
+    done.wait(timeout)
+
 SESSIONS_DIR      = Path(__file__).parent.parent / "sessions"
 SESSIONS_DIR.mkdir(exist_ok=True)
 EDGE_PROFILES_DIR = Path(__file__).parent.parent / "perfil_edge"
@@ -57,10 +107,122 @@ EDGE_PROFILES_DIR.mkdir(exist_ok=True)
 USE_SYSTEM_CHROME = (os.environ.get("SONNY_USE_SYSTEM_CHROME") or "").strip().lower() in {"1","true","yes","si","sí"}
 CHROME_CDP_URL    = (os.environ.get("SONNY_CHROME_CDP_URL") or "http://127.0.0.1:9222").strip()
 
+# Sondeo de _wait_for_response (segundos)
+POLL_MIN         = 0.2
+POLL_MAX         = 3.0
+NO_TEXT_WARN_S   = 16
+NO_TEXT_GIVEUP_S = 40
+# Lectura forzada cada tantos segundos aunque el DOM no haya avisado
+HEARTBEAT_S      = 5
+# Segundos sin cambios en el texto (y sin generación activa) para dar una
+# respuesta por terminada. Va por tiempo, no por ticks: el intervalo de
+# sondeo varía (POLL_MIN…POLL_MAX) y un conteo de ticks encogería la ventana.
+STABLE_S         = 4.0
+# Silencio del DOM (ms) que confirma una respuesta terminada
+DOM_QUIET_MS     = 1500
+# Sin cambios en el texto, el intervalo se duplica cada POLL_IDLE_STEP_S
+# (0.2 → 0.4 → 0.8 … hasta POLL_MAX): rápido al principio, barato en pausas largas
+POLL_IDLE_STEP_S = 5
+
+# Espera del login manual: hasta LOGIN_TIMEOUT_S a que aparezca el input del chat
+LOGIN_TIMEOUT_S  = 600
+
+# Reintentos tras un fallo: RETRY_BASE_S × 2^intento (±RETRY_JITTER), con tope
+# RETRY_CAP_S. El primero llega a los ~50 ms en vez de tras 1-2 s fijos.
+RETRY_BASE_S     = 0.05
+RETRY_CAP_S      = 3.0
+RETRY_JITTER     = 0.3
+
+
+def _backoff_delay(attempt: int) -> float:
+    delay = min(RETRY_CAP_S, RETRY_BASE_S * 2 ** attempt)
+    return delay * (1 + random.uniform(-RETRY_JITTER, RETRY_JITTER))
+
+
+# Botón/enlace "Log in" de ChatGPT sin sesión (lista única: una consulta)
+_CHATGPT_LOGIN_SEL = ('button:has-text("Iniciar sesión"), a:has-text("Iniciar sesión"), '
+                      'button:has-text("Log in"), a:has-text("Log in")')
+
+# Modificador de los atajos de teclado (Cmd en macOS)
+_MOD_KEY = "Meta" if sys.platform == "darwin" else "Control"
+
+# ¿Hay backend de portapapeles? En Linux sin xclip/xsel/wl-copy pyperclip
+# falla siempre: ni se intenta (fork+exec y espera perdidos)
+_HAS_CLIPBOARD = (sys.platform in ("darwin", "win32")
+                  or any(shutil.which(b) for b in ("xclip", "xsel", "wl-copy")))
+
+# pyperclip se importa en el primer pegado por portapapeles: al cargar busca
+# backends (ctypes, xclip/xsel) y casi ningún envío lo necesita
+_PYPERCLIP = None
+
+def _clipboard_copy(text: str):
+    global _PYPERCLIP
+    if _PYPERCLIP is None:
+        import pyperclip
+        _PYPERCLIP = pyperclip
+    _PYPERCLIP.copy(text)
+
+# Tope (ms) para que el texto pegado aparezca en el input
+PASTE_WAIT_MS    = 3000
+# Tope (ms) para que se habilite el botón de enviar; sin él se pulsa Enter
+SEND_READY_MS    = 500
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  CONFIGURACIÓN DE SITIOS
 # ══════════════════════════════════════════════════════════════════════════════
 
+# Texto legible de un subárbol sin innerText (que fuerza layout/reflow):
+# textContent con saltos de línea explícitos en bloques y <br>, y <pre> tal
+# cual. Recorrido plano con TreeWalker; los bloques abiertos van en una pila
+# y emiten su salto al salir de ellos. Se inserta en cada extract_js en lugar
+# de __TEXT_OF__.
+_TEXT_OF_JS = r"""
+(() => {
+    const BLOCK = new Set(['P', 'DIV', 'LI', 'UL', 'OL', 'H1', 'H2', 'H3', 'H4',
+                           'H5', 'H6', 'BLOCKQUOTE', 'TABLE', 'TR', 'HR',
+                           'SECTION', 'ARTICLE']);
+    // preOf(pre) opcional: texto propio de cada <pre> (por defecto textContent).
+    // skip opcional: selector de subárboles que no aportan texto (botones,
+    // bloques de razonamiento); se saltan en el DOM vivo, sin clonar.
+    return (root, preOf, skip) => {
+        const parts = [], open = [];
+        let endsNl = true;
+        const push = (t) => { if (t) { parts.push(t); endsNl = t.endsWith('\n'); } };
+        const walker = document.createTreeWalker(
+            root, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT
+        );
+        const jumpPast = (n) => {
+            let last = n;
+            while (last.lastChild) last = last.lastChild;
+            walker.currentNode = last;
+        };
+        for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+            while (open.length && !open[open.length - 1].contains(n)) {
+                open.pop();
+                if (!endsNl) push('\n');
+            }
+            if (n.nodeType === Node.TEXT_NODE) { push(n.data); continue; }
+            if (skip && n.matches(skip)) { jumpPast(n); continue; }
+            const tag = n.nodeName;
+            if (tag === 'BR') { push('\n'); continue; }
+            if (tag === 'PRE') {
+                // Bloque de código: su texto íntegro y saltar el subárbol
+                if (!endsNl) push('\n');
+                push(preOf ? preOf(n) : n.textContent);
+                push('\n');
+                jumpPast(n);
+                continue;
+            }
+            if (BLOCK.has(tag)) {
+                if (!endsNl) push('\n');
+                open.push(n);
+            }
+        }
+        return parts.join('');
+    };
+})()
+"""
+
 AI_SITES = {
     # ── Claude ────────────────────────────────────────────────────────────────
     "claude": {
@@ -77,7 +239,10 @@ AI_SITES = {
             }
         """,
         "extract_js": r"""
-            (prevCount) => {
+            (() => {
+            const textOf = __TEXT_OF__;
+            const THINKING_SEL = '[data-testid="thinking-block"], .thinking-block, details';
+            return (prevCount) => {
                 const renders = Array.from(
                     document.querySelectorAll('[data-test-render-count]')
                 );
@@ -85,14 +250,9 @@ AI_SITES = {
 
                 const newest = renders[renders.length - 1];
                 const responseDiv = newest.querySelector('.font-claude-response') || newest;
-                const clone = responseDiv.cloneNode(true);
-
-                clone.querySelectorAll(
-                    '[data-testid="thinking-block"], .thinking-block, details'
-                ).forEach(t => t.remove());
-
-                return clone.innerText.trim();
-            }
+                return textOf(responseDiv, null, THINKING_SEL).trim();
+            };
+            })()
         """,
     },
 
@@ -124,8 +284,44 @@ AI_SITES = {
         #  3. Maneja spans de línea (syntax highlighters sin \n en text nodes).
         #  4. Fallback a textContent completo si innerText devuelve muy poco.
         #
+        #  Los selectores constantes viven en el closure (IIFE): se forman una
+        #  vez por carga de página al instalar el script, no en cada llamada.
+        #
         "extract_js": r"""
-            (prevCount) => {
+            (() => {
+            // ── FIX 5a: Eliminar SOLO botones específicos de ChatGPT ──────────
+            // ANTES (problemático): 'button, [class*="action"], [class*="feedback"]'
+            // Eso eliminaba divs contenedores de bloques de código.
+            // AHORA: solo data-testid exactos de botones de UI.
+            // Un único :is(), con los casos más frecuentes primero
+            const BTN_SEL = ':is(' + [
+                '[data-testid="copy-turn-action-button"]',
+                '.code-block__copy-button',
+                '[data-testid="thumbs-up-button"]',
+                '[data-testid="thumbs-down-button"]',
+                '[data-testid="voice-play-turn-action-button"]',
+                '[data-testid="regenerate-button"]',
+                '[data-testid="read-aloud-turn-action-button"]',
+                // Botón de copiar dentro del bloque de código (el icono, no el contenido)
+                '.copybtn',
+                'button[title="Copy"]',
+                'button[aria-label="Copy"]',
+                'button[aria-label="Copiar"]',
+            ].join(', ') + ')';
+
+            // Spans de línea de syntax highlighters (.line, token-line, etc.)
+            const LINE_SEL = '.line, [class*=" line"], [class^="line"], ' +
+                             '.token-line, .code-line, [data-line]';
+
+            // Firma barata del último mensaje: si no cambió desde el sondeo
+            // anterior se devuelve el texto ya extraído sin recorrer el subárbol.
+            let lastSig = null, lastText = '';
+
+            // textContent + saltos de línea explícitos en elementos de bloque:
+            // mismo resultado legible que innerText sin forzar layout/reflow.
+            const textOf = __TEXT_OF__;
+
+            return (prevCount) => {
                 const msgs = Array.from(
                     document.querySelectorAll('[data-message-author-role="assistant"]')
                 );
@@ -133,112 +329,66 @@ AI_SITES = {
 
                 const newest = msgs[msgs.length - 1];
 
+                const sig = msgs.length + '|' + newest.childElementCount + '|' +
+                            newest.textContent.length;
+                if (sig === lastSig) return lastText;
+                const done = (text) => { lastSig = sig; lastText = text; return text; };
+
                 // ── Verificación rápida: hay contenido real? ──────────────────
-                // Usamos el DOM VIVO para verificar antes de clonar
-                const quickText = (newest.innerText || newest.textContent || '').trim();
-                if (!quickText || quickText.length < 2) return '';
-
-                const clone = newest.cloneNode(true);
-
-                // ── FIX 5a: Eliminar SOLO botones específicos de ChatGPT ──────
-                // ANTES (problemático): 'button, [class*="action"], [class*="feedback"]'
-                // Eso eliminaba divs contenedores de bloques de código.
-                // AHORA: solo data-testid exactos de botones de UI.
-                clone.querySelectorAll([
-                    '[data-testid="copy-turn-action-button"]',
-                    '[data-testid="thumbs-up-button"]',
-                    '[data-testid="thumbs-down-button"]',
-                    '[data-testid="voice-play-turn-action-button"]',
-                    '[data-testid="regenerate-button"]',
-                    '[data-testid="read-aloud-turn-action-button"]',
-                    // Botón de copiar dentro del bloque de código (el icono, no el contenido)
-                    '.code-block__copy-button',
-                    '.copybtn',
-                    'button[title="Copy"]',
-                    'button[aria-label="Copy"]',
-                    'button[aria-label="Copiar"]',
-                ].join(', ')).forEach(el => el.remove());
+                // Usamos el DOM VIVO para verificar antes de recorrerlo
+                const quickText = (newest.textContent || '').trim();
+                if (!quickText || quickText.length < 2) return done('');
 
                 // ── FIX 5b: Procesar bloques <pre> preservando newlines ───────
                 //
-                // ORDEN CRÍTICO: primero convertir <br> DENTRO del <pre>,
-                // luego añadir \n en spans de línea, luego extraer textContent.
-                // En v9, los <br> globales se procesaban DESPUÉS de que el <pre>
-                // ya había sido reemplazado → los <br> internos quedaban perdidos.
-                //
-                clone.querySelectorAll('pre').forEach(pre => {
-
-                    // Paso A: <br> dentro del <pre> → \n explícito
-                    pre.querySelectorAll('br').forEach(br => {
-                        br.parentNode.replaceChild(
-                            document.createTextNode('\n'), br
-                        );
-                    });
-
-                    // Paso B: Syntax highlighters que usan spans con display:block
-                    // (PrismJS, highlight.js, ChatGPT custom) → añadir \n al final
-                    // de cada span de línea para que textContent los incluya.
-                    // Selectores comunes: .line, [class*="line "], token-line, etc.
-                    const lineSpans = pre.querySelectorAll(
-                        '.line, [class*=" line"], [class^="line"], ' +
-                        '.token-line, .code-line, [data-line]'
-                    );
-                    if (lineSpans.length > 1) {
-                        lineSpans.forEach(span => {
-                            const lastChild = span.lastChild;
-                            // Solo añadir \n si no termina ya con uno
-                            if (!lastChild ||
-                                lastChild.nodeType !== Node.TEXT_NODE ||
-                                !lastChild.textContent.endsWith('\n')) {
-                                span.appendChild(document.createTextNode('\n'));
+                // Un solo recorrido del subárbol por <pre> (antes: querySelectorAll
+                // de <br>, querySelectorAll de LINE_SEL y textContent = 3 pasadas):
+                //   · texto → tal cual
+                //   · <br>  → \n
+                //   · span de línea (PrismJS, highlight.js, ChatGPT custom) que no
+                //     termina ya en \n → \n al cerrarlo, solo si hay más de uno.
+                const preText = (pre) => {
+                    const parts = [], ends = [];
+                    let spans = 0;
+                    const walk = (node) => {
+                        for (let n = node.firstChild; n; n = n.nextSibling) {
+                            if (n.nodeType === Node.TEXT_NODE) { parts.push(n.data); continue; }
+                            if (n.nodeType !== Node.ELEMENT_NODE) continue;
+                            if (n.nodeName === 'BR') { parts.push('\n'); continue; }
+                            // Botón de copiar dentro del bloque: su etiqueta no es código
+                            if (n.matches(BTN_SEL)) continue;
+                            walk(n);
+                            if (n.matches(LINE_SEL)) {
+                                spans++;
+                                const last = n.lastChild;
+                                const endsNl = last && (last.nodeName === 'BR' ||
+                                    (last.nodeType === Node.TEXT_NODE && last.data.endsWith('\n')));
+                                if (!endsNl) ends.push(parts.length);
                             }
-                        });
-                    }
-
-                    // Paso C: Extraer textContent (ahora incluye \n de A y B)
-                    const rawText = pre.textContent;
-                    const withNewlines = '\n' + rawText + '\n';
-                    pre.parentNode.replaceChild(
-                        document.createTextNode(withNewlines), pre
-                    );
-                });
-
-                // ── FIX 5c: <br> fuera de <pre> (ya procesados los internos) ──
-                clone.querySelectorAll('br').forEach(br => {
-                    br.parentNode.replaceChild(
-                        document.createTextNode('\n'), br
-                    );
-                });
-
-                // ── FIX 5d: <code> inline sin <pre> padre ─────────────────────
-                clone.querySelectorAll('code').forEach(code => {
-                    // Si el code YA estaba dentro de un pre, fue procesado arriba
-                    // y el pre fue reemplazado → este code ya no tiene padre pre
-                    // Solo procesar codes que aún existan en el clone
-                    if (code.isConnected && code.closest('pre') === null) {
-                        const raw = code.textContent;
-                        if (code.parentNode) {
-                            code.parentNode.replaceChild(
-                                document.createTextNode(raw), code
-                            );
                         }
+                    };
+                    walk(pre);
+                    if (spans > 1) {
+                        for (let i = ends.length - 1; i >= 0; i--) parts.splice(ends[i], 0, '\n');
                     }
-                });
+                    return parts.join('');
+                };
 
-                const result = clone.innerText.trim();
+                // ── FIX 5c/5d: <pre>, <br> y <code> inline en UNA pasada ─────
+                // sobre el DOM vivo; los botones (FIX 5a, BTN_SEL) se saltan
+                // en el recorrido en vez de clonar el mensaje y quitarlos.
+                const result = textOf(newest, preText, BTN_SEL).trim();
 
-                // ── Fallback: si innerText devuelve muy poco pero quickText ──
-                // tiene bastante, usar textContent del clone como alternativa
+                // ── Fallback: si el texto devuelve muy poco pero quickText ────
+                // tiene bastante, devolver quickText (ya leído del nodo vivo;
+                // solo difiere en el texto de los botones, pocos chars)
                 if (result.length < 10 && quickText.length > result.length * 2) {
-                    // textContent no aplica CSS pero devuelve todo el texto
-                    const fallback = clone.textContent.trim();
-                    if (fallback.length > result.length) {
-                        return fallback;
-                    }
+                    return done(quickText);
                 }
 
-                return result;
-            }
+                return done(result);
+            };
+            })()
         """,
     },
 
@@ -257,13 +407,16 @@ AI_SITES = {
             }
         """,
         "extract_js": r"""
-            (prevCount) => {
+            (() => {
+            const textOf = __TEXT_OF__;
+            return (prevCount) => {
                 const msgs = Array.from(
                     document.querySelectorAll('.model-response-text')
                 );
                 if (msgs.length <= prevCount) return '';
-                return msgs[msgs.length - 1].innerText.trim();
-            }
+                return textOf(msgs[msgs.length - 1]).trim();
+            };
+            })()
         """,
     },
 
@@ -282,38 +435,160 @@ AI_SITES = {
             }
         """,
         "extract_js": r"""
-            (prevCount) => {
+            (() => {
+            const textOf = __TEXT_OF__;
+            return (prevCount) => {
                 const msgs = Array.from(
                     document.querySelectorAll('.markdown-body')
                 );
                 if (msgs.length <= prevCount) return '';
-                return msgs[msgs.length - 1].innerText.trim();
-            }
+                return textOf(msgs[msgs.length - 1]).trim();
+            };
+            })()
         """,
     },
 }
 
+# Derivados calculados una vez al importar: host de cada sitio y JS sin la
+# sangría del fuente (menos bytes en cada script que se instala)
+for _cfg in AI_SITES.values():
+    _cfg["_host"]       = (urlsplit(_cfg["url"]).hostname or "").lower()
+    _cfg["count_js"]    = textwrap.dedent(_cfg["count_js"]).strip()
+    _cfg["extract_js"]  = (textwrap.dedent(_cfg["extract_js"]).strip()
+                           .replace("__TEXT_OF__", textwrap.dedent(_TEXT_OF_JS).strip()))
+del _cfg
+
 # ── Helpers de Playwright ──────────────────────────────────────────────────────
 
-def check_playwright() -> bool:
+# Un único driver de Playwright (proceso Node) compartido por todas las
+# sesiones, con conteo de referencias: se para cuando cierra la última.
+# Cada sitio sigue con su propio perfil persistente (logins separados).
+_PW_SINGLETON = {"pw": None, "ref": 0}
+_PW_LOCK      = asyncio.Lock()
+
+async def _acquire_playwright():
+    async with _PW_LOCK:
+        if _PW_SINGLETON["pw"] is None:
+            from playwright.async_api import async_playwright
+            _PW_SINGLETON["pw"] = await async_playwright().start()
+        _PW_SINGLETON["ref"] += 1
+        return _PW_SINGLETON["pw"]
+
+async def _release_playwright():
+    async with _PW_LOCK:
+        _PW_SINGLETON["ref"] -= 1
+        if _PW_SINGLETON["ref"] > 0 or _PW_SINGLETON["pw"] is None:
+            return
+        pw, _PW_SINGLETON["pw"], _PW_SINGLETON["ref"] = _PW_SINGLETON["pw"], None, 0
+        await pw.stop()
+
+# Con SONNY_USE_SYSTEM_CHROME, una sola conexión CDP al Chrome real para
+# todas las sesiones (una pestaña por sitio), también con conteo de referencias
+_CDP_SHARED = {"browser": None, "ref": 0}
+_CDP_LOCK   = asyncio.Lock()
+
+async def _acquire_cdp_browser(pw):
+    async with _CDP_LOCK:
+        browser = _CDP_SHARED["browser"]
+        if browser is None or not browser.is_connected():
+            _CDP_SHARED["browser"] = await pw.chromium.connect_over_cdp(CHROME_CDP_URL)
+        _CDP_SHARED["ref"] += 1
+        return _CDP_SHARED["browser"]
+
+async def _release_cdp_browser():
+    async with _CDP_LOCK:
+        _CDP_SHARED["ref"] -= 1
+        if _CDP_SHARED["ref"] > 0 or _CDP_SHARED["browser"] is None:
+            return
+        browser, _CDP_SHARED["browser"], _CDP_SHARED["ref"] = _CDP_SHARED["browser"], None, 0
+        # Solo desconecta: el Chrome del usuario sigue abierto
+        await browser.close()
+
+# Memoizada: se consulta en cada envío y la URL de la pestaña casi nunca cambia
+@functools.lru_cache(maxsize=64)
+def _url_on_host(url: str, site_host: str) -> bool:
     try:
-        import playwright; return True
-    except ImportError:
+        host = urlsplit(url or "").hostname or ""
+    except ValueError:
         return False
+    return host == site_host or host.endswith("." + site_host)
+
+# None = aún no comprobado; se calcula una vez y se reutiliza en cada start()
+_PLAYWRIGHT_AVAILABLE = None
+
+def check_playwright() -> bool:
+    global _PLAYWRIGHT_AVAILABLE
+    if _PLAYWRIGHT_AVAILABLE is None:
+        try:
+            import playwright; _PLAYWRIGHT_AVAILABLE = True
+        except ImportError:
+            _PLAYWRIGHT_AVAILABLE = False
+    return _PLAYWRIGHT_AVAILABLE
 
 def install_playwright():
     import subprocess
-    print(f"  {C.YELLOW}Instalando Playwright...{C.RESET}")
+    log.info("  Instalando Playwright...", extra=LOG_WARN)
     subprocess.run([sys.executable, "-m", "pip", "install", "playwright",
                     "--break-system-packages", "-q"], check=True)
     subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], check=True)
-    print(f"  {C.GREEN}✅ Playwright instalado{C.RESET}")
+    global _PLAYWRIGHT_AVAILABLE
+    _PLAYWRIGHT_AVAILABLE = None
+    log.info("  ✅ Playwright instalado", extra=LOG_OK)
+
+
+# Indicadores de "la IA sigue escribiendo" comunes a todos los sitios
+_STOP_SEL = ", ".join((
+    'button[aria-label="Stop"]', 'button[aria-label="Detener"]',
+    'button[aria-label="Stop generating"]', '[data-testid="stop-button"]',
+    '[class*="stop-button"]', '[class*="spinner"]',
+    '[class*="loading"]', '[class*="generating"]', '[class*="streaming"]',
+))
+
+# [done_sel, stop_sel] → true si NO hay botón de envío habilitado y SÍ hay
+# indicador de generación. Un selector inválido cuenta como "no encontrado".
+_IS_GENERATING_JS = r"""
+([doneSels, stopSel]) => {
+    const has = (sel) => { try { return !!document.querySelector(sel); } catch (e) { return false; } };
+    if (doneSels.some(has)) return false;
+    return has(stopSel);
+}
+"""
+
+
+def _idle_poll(idle_s: float) -> float:
+    return min(POLL_MAX, POLL_MIN * 2 ** int(idle_s / POLL_IDLE_STEP_S))
 
 
-async def _query_first(page, selector_str: str):
-    for sel in selector_str.split(","):
-        sel = sel.strip()
-        if not sel: continue
+def _split_selectors(selector_str: str) -> tuple[str, ...]:
+    return tuple(sel.strip() for sel in selector_str.split(",") if sel.strip())
+
+
+# Primer elemento según el ORDEN de los selectores (preferencia), no el primero
+# del documento como haría la lista compuesta. Los inválidos se saltan.
+_FIRST_BY_PRIORITY_JS = """
+(sels) => {
+    for (const sel of sels) {
+        try { const el = document.querySelector(sel); if (el) return el; } catch (e) {}
+    }
+    return null;
+}
+"""
+
+
+async def _query_first(page, selectors):
+    # Acepta la tupla ya partida (BrowserSession la prepara en __init__)
+    sels = _split_selectors(selectors) if isinstance(selectors, str) else selectors
+    # Todos los selectores en un solo evaluate (un round-trip)
+    try:
+        handle = await page.evaluate_handle(_FIRST_BY_PRIORITY_JS, list(sels))
+        el = handle.as_element()
+        if el is None:
+            await handle.dispose()
+        return el
+    except Exception:
+        pass
+    # Sin evaluate (p.ej. contexto destruido al navegar): uno a uno
+    for sel in sels:
         try:
             el = await page.query_selector(sel)
             if el: return el
@@ -322,28 +597,158 @@ async def _query_first(page, selector_str: str):
     return None
 
 
-_EXTRACT_ARTIFACT_JS = r"""
-() => {
-  const results = [];
-  const tryFrame = (win, depth) => {
-    if (depth > 3) return;
-    try {
-      const body = win.document.body;
-      if (!body) return;
-      const text = (body.innerText || body.textContent || '').trim();
-      if (text && text.length > 50) results.push(text);
-    } catch(e) {}
-    try {
-      for (const frame of win.frames) tryFrame(frame, depth + 1);
-    } catch(e) {}
-  };
-  for (const iframe of document.querySelectorAll('iframe')) {
-    try { if (iframe.contentWindow) tryFrame(iframe.contentWindow, 0); } catch(e) {}
-  }
-  return results.join('\n\n---ARTIFACT---\n\n');
+# Contador de mensajes mantenido por un MutationObserver (una vez por documento):
+# la espera de "mensaje nuevo" solo lee una variable en vez de re-contar el DOM.
+# Las mutaciones se agrupan con un setTimeout corto para no contar en cada
+# token (no con requestAnimationFrame: no corre en pestañas en segundo plano,
+# y con una pestaña por sitio y varios sitios a la vez eso es lo normal).
+# Cuando el conteo cambia avisa a Python por el binding __NOTIFY__ (si existe),
+# y con el primer cambio de texto tras cada lectura, por __DIRTY__. Solo en
+# el documento principal: add_init_script también corre en los iframes.
+_MSG_OBSERVER_JS = r"""
+if (window.top === window && !window.__VAR___obs) {
+    let queued = false;
+    const recount = () => {
+        queued = false;
+        try {
+            const n = window.__COUNT__();
+            if (n !== window.__VAR__) {
+                window.__VAR__ = n;
+                if (window.__NOTIFY__) window.__NOTIFY__(n);
+            }
+        } catch (e) {}
+    };
+    window.__VAR___obs = new MutationObserver((muts) => {
+        // Primer cambio desde la última lectura de Python: avisar una vez
+        // (__DIRTY__); la lectura siguiente vuelve a armar el aviso
+        if (!window.__VAR___dirty) {
+            window.__VAR___dirty = true;
+            if (window.__DIRTY__) window.__DIRTY__();
+        }
+        if (!queued && muts.some(m => m.type === 'childList')) {
+            queued = true; setTimeout(recount, 50);
+        }
+    });
+    window.__VAR___obs.observe(document, { childList: true, characterData: true, subtree: true });
+    // Lectura O(1): solo re-cuenta si hubo mutaciones aún sin procesar (en
+    // segundo plano el setTimeout se retrasa, así que no se espera a él)
+    window.__VAR___read = () => {
+        if (queued || window.__VAR__ === undefined) recount();
+        return window.__VAR__;
+    };
+}
+"""
+
+# Recursos que la comprobación de login no necesita descargar
+_HEAVY_RESOURCES = frozenset({"image", "media", "font"})
+
+
+async def _abort_heavy_resources(route):
+    if route.request.resource_type in _HEAVY_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+# Lectura de un tick de _wait_for_response: [conteo, texto, generando, hash].
+# El texto solo viaja si su hash difiere del que ya tiene Python (known).
+_POLL_JS = r"""
+([prev, known]) => {
+    window.__VAR___dirty = false;
+    const n = window.__READ__, t = window.__EXTRACT__, g = window.__GEN__;
+    if (!n || !t || !g) return null;
+    const text = t(prev) || '';
+    let h = text.length | 0;
+    for (let i = 0; i < text.length; i++) h = (Math.imul(h, 31) + text.charCodeAt(i)) | 0;
+    return [n(), h === known ? null : text, g(), h];
+}
+"""
+
+# Confirmación de fin dentro de la página: resuelve false en cuanto el
+# MutationObserver marca el DOM como sucio desde la última lectura, o, tras
+# quietMs sin mutaciones, true si la sonda de generación ya no ve actividad
+# y el botón de envío (done_sel) vuelve a estar presente y habilitado.
+# Un evaluate en vez de varios ticks de sondeo desde Python.
+_QUIET_JS = r"""
+([v, gen, quietMs, doneSel]) => new Promise((resolve) => {
+    if (!window[v + '_obs'] || !window[gen]) return resolve(false);
+    const end = performance.now() + quietMs;
+    const tick = () => {
+        if (window[v + '_dirty']) return resolve(false);
+        if (performance.now() >= end) {
+            return resolve(!window[gen]() && !!document.querySelector(doneSel));
+        }
+        setTimeout(tick, 50);
+    };
+    tick();
+})
+"""
+
+# Texto de un frame (para iframes cross-origin, evaluado frame a frame).
+# Recibe el hash ya conocido (el mismo de _POLL_JS): si coincide devuelve
+# [hash, null] y el texto no viaja otra vez por CDP. textOf conserva los
+# saltos de línea sin forzar layout y deja fuera scripts y estilos.
+_FRAME_TEXT_JS = """
+(known) => {
+  const body = document.body;
+  if (!body) return [0, ''];
+  const textOf = __TEXT_OF__;
+  const text = textOf(body, null, 'script, style, noscript, template');
+  let h = text.length | 0;
+  for (let i = 0; i < text.length; i++) h = (Math.imul(h, 31) + text.charCodeAt(i)) | 0;
+  return [h, h === known ? null : text];
+}
+""".replace("__TEXT_OF__", textwrap.dedent(_TEXT_OF_JS).strip())
+
+# Promesa que resuelve true cuando el input alcanza minLen caracteres, o false
+# al agotar timeoutMs. Sirve para textarea (.value) y contenteditable. Solo
+# viaja de vuelta el booleano, nunca el texto pegado.
+_INPUT_FILLED_JS = r"""
+(el, [minLen, timeoutMs]) => new Promise((resolve) => {
+    // textContent (no innerText) en contenteditable: medir no fuerza layout
+    const len = () => ((el.isContentEditable ? el.textContent : el.value) || '').trim().length;
+    if (len() >= minLen) return resolve(true);
+    let obs = null, timer = null;
+    const finish = (ok) => {
+        if (obs) obs.disconnect();
+        el.removeEventListener('input', check);
+        clearTimeout(timer);
+        resolve(ok);
+    };
+    const check = () => { if (len() >= minLen) finish(true); };
+    obs = new MutationObserver(check);
+    obs.observe(el, { childList: true, characterData: true, subtree: true });
+    el.addEventListener('input', check);
+    timer = setTimeout(() => finish(false), timeoutMs);
+})
+"""
+
+# Foco + seleccionar todo en un solo evaluate (antes: focus() y Ctrl+A, dos
+# round-trips): lo que se inserte después reemplaza el contenido previo
+_FOCUS_SELECT_JS = r"""
+(el) => {
+    el.focus();
+    if (typeof el.select === 'function') el.select();
+    else document.execCommand('selectAll');
 }
 """
 
+# Escribe el texto en un textarea (setter nativo, para que React lo vea) o en
+# un contenteditable y dispara los eventos que los frameworks escuchan
+_SET_INPUT_TEXT_JS = r"""
+(el, text) => {
+    el.focus();
+    if (el.isContentEditable) {
+        el.innerText = text;
+    } else {
+        const ns = Object.getOwnPropertyDescriptor(
+                       window.HTMLTextAreaElement.prototype, 'value')?.set;
+        if (ns) ns.call(el, text); else el.value = text;
+    }
+    el.dispatchEvent(new Event('input',  { bubbles: true }));
+    el.dispatchEvent(new Event('change', { bubbles: true }));
+}
+"""
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  BROWSER SESSION
@@ -363,9 +768,83 @@ class BrowserSession:
         self._page                = None
         self._pw                  = None
         self._started             = False
+        self._closing             = False
+        # ChatGPT: tras confirmar la sesión no se vuelve a buscar el botón de
+        # login en cada prompt (se invalida si la respuesta no llega)
+        self._chatgpt_logged_in   = False
         self._using_system_chrome = False
+        # Pestaña abierta por esta sesión en el Chrome real (se cierra al salir)
+        self._owns_page           = False
+        # Sesión dueña del contexto si ésta es una pestaña extra (open_tab)
+        self._tab_of              = None
         self._profile_dir = EDGE_PROFILES_DIR / f"profile_{site_key}"
         self._profile_dir.mkdir(exist_ok=True)
+        # Host del sitio: precalculado al importar (antes: re.sub por llamada)
+        self._site_url    = self.site["url"]
+        self._site_host   = self.site["_host"]
+        self._input_sel   = self.site["input_sel"]
+        # Listas de selectores partidas una vez, no en cada sondeo
+        self._input_sels  = _split_selectors(self.site["input_sel"])
+        self._send_sels   = _split_selectors(self.site["send_sel"])
+        self._done_sels   = _split_selectors(self.site["done_sel"])
+        # Botón de enviar ya habilitado (se activa con el evento input)
+        self._send_ready  = ", ".join(f"{sel}:not([disabled])" for sel in self._send_sels)
+        # count_js/extract_js se instalan UNA vez por documento como funciones
+        # de window; cada sondeo solo envía una llamada corta por nombre.
+        self._count_fn    = f"__sonny_count_{site_key}"
+        self._extract_fn  = f"__sonny_extract_{site_key}"
+        self._msgs_var    = f"__sonny_msgCount_{site_key}"
+        self._msgs_read   = f"{self._msgs_var}_read"
+        self._generating_fn = f"__sonny_generating_{site_key}"
+        self._notify_fn   = f"__sonny_notify_{site_key}"
+        self._dirty_fn    = f"__sonny_dirty_{site_key}"
+        generating_args   = json.dumps([self._done_sels, _STOP_SEL])
+        self._install_js  = (f"window.{self._count_fn} = ({self.site['count_js']});\n"
+                             f"window.{self._extract_fn} = ({self.site['extract_js']});\n"
+                             f"window.{self._generating_fn} = ((f, a) => () => f(a))"
+                             f"({_IS_GENERATING_JS.strip()}, {generating_args});\n"
+                             + _MSG_OBSERVER_JS.replace("__COUNT__", self._count_fn)
+                                               .replace("__VAR__", self._msgs_var)
+                                               .replace("__NOTIFY__", self._notify_fn)
+                                               .replace("__DIRTY__", self._dirty_fn))
+        # Aviso push de "mensaje nuevo": el observer llama al binding y éste
+        # fija el conteo y despierta a quien espera en _wait_new_message()
+        self._msg_event   = asyncio.Event()
+        self._msg_count   = 0
+        self._has_binding = False
+        # ¿Cambió el DOM desde el último _poll_state? Si no, no hace falta
+        # volver a extraer: el texto es el mismo
+        self._dom_dirty   = True
+        # Texto de iframes de artefactos leído en este turno: frame (por
+        # identidad; varios iframes comparten url, p.ej. about:srcdoc) →
+        # (hash, texto). Se vacía en cada _submit_prompt.
+        self._artifact_cache: dict[object, tuple[int, str]] = {}
+        # Handle del input del chat: se reutiliza mientras siga visible y se
+        # descarta al navegar el frame principal
+        self._input_handle = None
+        # page.evaluate() trata como función todo string con "=>": envolverlo
+        self._install_fn  = "() => {\n" + self._install_js + "\n}"
+        # Scripts de llamada armados una vez por sesión, no en cada sondeo
+        self._fn_calls    = {
+            name: f"(a) => {{ const f = window.{name}; return f ? [f(a)] : null; }}"
+            for name in (self._count_fn, self._extract_fn, self._msgs_read,
+                         self._generating_fn)
+        }
+        # Predicado de _wait_new_message sin binding: mismo script en cada
+        # llamada (prev_count va como argumento, no interpolado)
+        self._new_msg_pred = (f"(prev) => (window.{self._msgs_var} ?? "
+                              f"(window.{self._count_fn} || ({self.site['count_js']}))()) > prev")
+        self._poll_call   = (_POLL_JS.replace("__VAR__", self._msgs_var)
+                                     .replace("__READ__", self._msgs_read)
+                                     .replace("__EXTRACT__", self._extract_fn)
+                                     .replace("__GEN__", self._generating_fn))
+        self._quiet_args  = [self._msgs_var, self._generating_fn, DOM_QUIET_MS,
+                             self.site["done_sel"]]
+        # Último texto recibido en _poll_state y su hash (calculado en la página)
+        self._poll_hash   = None
+        self._poll_text   = ""
+        # "¿Sigue generando?" según la última lectura de _poll_state
+        self._last_generating = False
 
     # ── Ciclo de vida ──────────────────────────────────────────────────────────
 
@@ -373,28 +852,52 @@ class BrowserSession:
         if not USE_SYSTEM_CHROME:
             return False
         try:
-            self._browser = await self._pw.chromium.connect_over_cdp(CHROME_CDP_URL)
+            self._browser = await _acquire_cdp_browser(self._pw)
             self._using_system_chrome = True
             contexts      = self._browser.contexts
             self._context = contexts[0] if contexts else await self._browser.new_context()
-            pages         = self._context.pages
-            self._page    = pages[0] if pages else await self._context.new_page()
-            print(f"  {C.GREEN}✅ Conectado a Chrome real: {CHROME_CDP_URL}{C.RESET}")
+            # Pestaña propia por sitio (antes todas las sesiones usaban pages[0]
+            # a la vez): se reutiliza una ya abierta en el sitio o se abre otra
+            self._page = next((p for p in self._context.pages
+                               if _url_on_host(p.url, self._site_host)), None)
+            if self._page is None:
+                self._page       = await self._context.new_page()
+                self._owns_page  = True
+            log.info("  ✅ Conectado a Chrome real: %s", CHROME_CDP_URL, extra=LOG_OK)
             return True
         except Exception as e:
-            print(f"  {C.YELLOW}⚠️  CDP falló: {e} — usando Edge persistente{C.RESET}")
+            log.info("  ⚠️  CDP falló: %s — usando Edge persistente", e, extra=LOG_WARN)
+            if self._browser:
+                try:
+                    await _release_cdp_browser()
+                except Exception:
+                    pass
+            self._browser = self._context = self._page = None
+            self._using_system_chrome = self._owns_page = False
             return False
 
     async def start(self):
         if self._started:
             return self
 
-        if not check_playwright():
-            install_playwright()
+        if not (_PLAYWRIGHT_AVAILABLE or check_playwright()):
+            # Subprocesos bloqueantes (pip, playwright install): en un hilo,
+            # sin congelar las demás sesiones del loop
+            await asyncio.to_thread(install_playwright)
 
-        from playwright.async_api import async_playwright
-        self._pw = await async_playwright().start()
+        self._pw = await _acquire_playwright()
+        try:
+            await self._launch()
+        except BaseException:
+            # Arranque a medias: cerrar lo abierto y soltar la referencia al
+            # driver compartido (si no, nunca llegaría a pararse)
+            self._started = True
+            await self.close()
+            raise
+        self._started = True
+        return self
 
+    async def _launch(self):
         if not await self._start_with_system_chrome():
             self._context = await self._pw.chromium.launch_persistent_context(
                 str(self._profile_dir),
@@ -420,29 +923,110 @@ class BrowserSession:
             )
 
         await self._context.grant_permissions(["clipboard-read", "clipboard-write"])
-        self._started = True
-        return self
+        await self._setup_page()
+
+    async def _setup_page(self):
+        """Bindings y scripts del sitio en self._page (pestaña principal o extra)."""
+        self._page.on("framenavigated", self._on_navigated)
+        try:
+            await self._page.expose_binding(self._notify_fn, self._on_msg_count)
+            await self._page.expose_binding(self._dirty_fn, self._on_dom_dirty)
+            self._has_binding = True
+        except Exception:
+            self._has_binding = False
+        # Scripts de extracción: en cada navegación futura y en el documento actual
+        await self._page.add_init_script(self._install_js)
+        try:
+            await self._page.evaluate(self._install_fn)
+        except Exception:
+            pass
+
+    def _on_msg_count(self, source, count):
+        # add_init_script también corre en los iframes: solo cuenta el documento principal
+        if source.get("frame") is not self._page.main_frame:
+            return
+        try:
+            self._msg_count = int(count or 0)
+        except (TypeError, ValueError):
+            return
+        self._msg_event.set()
+
+    def _on_navigated(self, frame):
+        if frame == self._page.main_frame:
+            self._input_handle = None
+
+    async def _input_element(self):
+        el = self._input_handle
+        if el is not None:
+            try:
+                if await el.is_visible():
+                    return el
+            except Exception:
+                pass
+        el = self._input_handle = await _query_first(self._page, self._input_sels)
+        return el
+
+    def _on_dom_dirty(self, source):
+        if source.get("frame") is not self._page.main_frame:
+            return
+        self._dom_dirty = True
+
+    async def open_tab(self) -> "BrowserSession":
+        """
+        Pestaña nueva en el mismo contexto (mismo perfil y login) para una
+        conversación independiente. Su close() solo cierra esa pestaña.
+        """
+        await self.start()
+        tab = BrowserSession(self.site_key)
+        tab._context = self._context
+        tab._page    = await self._context.new_page()
+        tab._tab_of  = self
+        try:
+            await tab._setup_page()
+        except BaseException:
+            await tab._page.close()
+            raise
+        tab._started = True
+        return tab
 
     async def close(self):
-        if not self._started:
+        if not self._started or self._closing:
+            return
+        # Marca visible para el pool: una sesión cerrándose no se reutiliza
+        self._closing = True
+        if self._tab_of is not None:
+            # Pestaña extra: el contexto y el driver son de la sesión dueña
+            try:
+                await self._page.close()
+            except Exception:
+                pass
+            self._context = self._page = self._tab_of = self._input_handle = None
+            self._started = self._closing = False
             return
         if not self._using_system_chrome and self._context:
             try:
                 await self._context.close()
             except Exception:
                 pass
+        if self._using_system_chrome and self._owns_page and self._page:
+            try:
+                await self._page.close()
+            except Exception:
+                pass
         if self._browser:
             try:
-                await self._browser.close()
+                await _release_cdp_browser()
             except Exception:
                 pass
         if self._pw:
             try:
-                await self._pw.stop()
+                await _release_playwright()
             except Exception:
                 pass
         self._browser = self._context = self._page = self._pw = None
-        self._started = self._using_system_chrome = False
+        self._input_handle = None
+        self._started = self._using_system_chrome = self._closing = False
+        self._owns_page = False
 
     async def __aenter__(self):
         return await self.start()
@@ -461,118 +1045,212 @@ class BrowserSession:
 
     async def _chatgpt_has_login_button(self) -> bool:
         if self.site_key != "chatgpt": return False
-        for sel in ['button:has-text("Iniciar sesión")', 'a:has-text("Iniciar sesión")',
-                    'button:has-text("Log in")',          'a:has-text("Log in")']:
-            try:
-                if await self._page.query_selector(sel): return True
-            except Exception: pass
-        return False
+        try:
+            return await self._page.query_selector(_CHATGPT_LOGIN_SEL) is not None
+        except Exception:
+            return False
 
     async def _wait_until_chatgpt_ready_after_login(self, timeout_s=120) -> bool:
         if self.site_key != "chatgpt": return True
-        deadline = time.time() + timeout_s
-        while time.time() < deadline:
+        loop     = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_s
+        page     = self._page
+        errors   = 0
+        while (remaining := deadline - loop.time()) > 0:
             try:
-                url = (self._page.url or "").lower()
-                if "accounts.google.com" in url or "auth.openai.com" in url:
-                    await asyncio.sleep(1); continue
-                if await self._page.query_selector(self.site["input_sel"]):
-                    if not await self._chatgpt_has_login_button(): return True
-                await self._page.wait_for_timeout(2000)
+                # Sin sleeps: wait_for_selector sigue esperando a través de
+                # las redirecciones de accounts.google.com / auth.openai.com
+                # y resuelve en cuanto el input del chat es visible.
+                await page.wait_for_selector(self._input_sel, state="visible",
+                                             timeout=remaining * 1000)
+                if not await self._chatgpt_has_login_button(): return True
+                # Input visible pero con "Log in": chat sin sesión, esperar a
+                # que el botón desaparezca
+                await page.wait_for_selector(_CHATGPT_LOGIN_SEL, state="detached",
+                                             timeout=max(deadline - loop.time(), 0.1) * 1000)
             except Exception:
-                await asyncio.sleep(1)
+                if self._closing:
+                    return False
+                # Timeout (el while termina) o contexto destruido al navegar
+                await asyncio.sleep(_backoff_delay(errors))
+                errors += 1
         return False
 
     # ── Login manual ───────────────────────────────────────────────────────────
 
+    def _on_site(self) -> bool:
+        # Host exacto de la URL actual (urlsplit), no una subcadena: una URL de
+        # login con "?redirect=chatgpt.com" no cuenta como estar en el sitio
+        return _url_on_host(self._page.url or "", self._site_host)
+
     async def needs_login(self, navigate_if_needed=True) -> bool:
         page = self._page
-        site = self.site
+        # Sonda barata primero: ya en el sitio y con el input visible (el caso
+        # habitual) no hace falta navegar ni esperar al selector. En ChatGPT
+        # el input también existe sin sesión: manda el botón "Log in".
+        try:
+            if self._on_site():
+                el = await self._input_element()
+                if el and await el.is_visible():
+                    return await self._chatgpt_has_login_button()
+        except Exception: pass
         if navigate_if_needed:
             try:
-                site_host = re.sub(r"^https?://", "", site["url"]).split("/")[0].lower()
-                if site_host not in (page.url or "").lower():
-                    await page.goto(site["url"], wait_until="domcontentloaded", timeout=30000)
-                    await asyncio.sleep(3)
+                if not self._on_site():
+                    # Solo se busca el selector del input: imágenes, vídeo y
+                    # fuentes de la landing no hacen falta en esta navegación.
+                    await page.route("**/*", _abort_heavy_resources)
+                    try:
+                        await page.goto(self._site_url, wait_until="domcontentloaded", timeout=30000)
+                    finally:
+                        await page.unroute("**/*", _abort_heavy_resources)
             except Exception: pass
+        # Hasta 3 s para que aparezca el input (antes: sleep(3) fijo y consulta)
         try:
-            if await page.query_selector(site["input_sel"]):
-                return False
+            await page.wait_for_selector(self._input_sel, state="visible", timeout=3000)
+            return False
         except Exception: pass
         return True
 
     async def wait_for_login(self):
+        # Sin input(): se detecta solo cuando el input del chat aparece. Un
+        # input() en un hilo no se puede cancelar y se quedaría con la
+        # siguiente línea que el usuario escriba en la consola de Sonny.
         site = self.site
-        print(f"\n  {C.YELLOW}🔐 Inicia sesión en {site['name']}.")
-        print(f"  Loguéate y luego vuelve aquí.{C.RESET}")
-        print(f"  {C.CYAN}Presiona ENTER cuando hayas iniciado sesión...{C.RESET}")
-        input()
+        log.info("\n  🔐 Inicia sesión en %s en la ventana del navegador.", site["name"],
+                 extra=LOG_WARN)
+        log.info("  Se detectará automáticamente al terminar (máx. %d min)...",
+                 LOGIN_TIMEOUT_S // 60, extra=LOG_INFO)
         if self.site_key == "chatgpt":
-            await self._wait_until_chatgpt_ready_after_login()
-        print(f"  {C.GREEN}✅ Sesión persistida en {self._profile_dir}{C.RESET}\n")
+            logged = await self._wait_until_chatgpt_ready_after_login(LOGIN_TIMEOUT_S)
+        else:
+            logged = await self._wait_until_logged_in(LOGIN_TIMEOUT_S)
+        if logged:
+            log.info("  ✅ Sesión persistida en %s\n", self._profile_dir, extra=LOG_OK)
+        else:
+            log.info("  ⚠️  No se detectó el inicio de sesión; se continúa igualmente\n", extra=LOG_WARN)
+
+    async def _wait_until_logged_in(self, timeout_s: float) -> bool:
+        # Una sola espera al input del chat (persiste entre navegaciones del
+        # login) en vez de consultar needs_login cada pocos segundos
+        loop     = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_s
+        errors   = 0
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                await self._page.wait_for_selector(self._input_sel, state="visible",
+                                                   timeout=remaining * 1000)
+                return True
+            except Exception:
+                if self._closing:
+                    return False
+                # Timeout (el while termina) o contexto destruido al navegar
+                await asyncio.sleep(_backoff_delay(errors))
+                errors += 1
+        return False
 
     # ── Extracción por-IA ──────────────────────────────────────────────────────
 
+    async def _call_site_fn(self, name: str, arg=None):
+        """
+        Llama a una función instalada por _install_js. Si el documento no la
+        tiene (p.ej. navegación antes del init script), la instala y reintenta.
+        """
+        call = self._fn_calls[name]
+        res = await self._page.evaluate(call, arg)
+        if res is None:
+            await self._page.evaluate(self._install_fn)
+            res = await self._page.evaluate(call, arg)
+        return res[0] if res else None
+
     async def _count_responses(self) -> int:
         try:
-            count = await self._page.evaluate(self.site["count_js"])
+            # Conteo mantenido por el MutationObserver: sin recorrer el DOM
+            count = await self._call_site_fn(self._msgs_read)
             return int(count or 0)
         except Exception:
             return 0
 
-    async def _extract_new_response(self, prev_count: int) -> str:
+    async def _poll_state(self, prev_count: int) -> tuple[int, str, bool]:
+        """
+        Conteo, texto nuevo y "¿sigue generando?" en un solo evaluate: un
+        mensaje CDP por tick y los tres valores leídos sobre el mismo DOM.
+        Si el hash del texto coincide con el de la lectura anterior, la
+        página no lo reenvía y se reutiliza el que ya tenemos. El estado de
+        generación queda además en _last_generating.
+        """
+        call = self._poll_call
+        arg  = [prev_count, self._poll_hash]
+        self._dom_dirty = False
+        try:
+            res = await self._page.evaluate(call, arg)
+            if res is None:
+                await self._page.evaluate(self._install_fn)
+                res = await self._page.evaluate(call, arg)
+            if not res:
+                return 0, "", False
+            count, texto, generating, text_hash = res
+            if texto is None:
+                texto = self._poll_text
+            else:
+                self._poll_text, self._poll_hash = texto, text_hash
+            self._last_generating = bool(generating)
+            return int(count or 0), texto.strip(), self._last_generating
+        except Exception:
+            return 0, "", False
+
+    async def _wait_dom_quiet(self) -> bool:
+        """
+        True si el DOM no cambia durante DOM_QUIET_MS desde la última lectura
+        de _poll_state, no hay generación activa y el botón de envío está
+        listo (done_sel); False al primer cambio.
+        """
         try:
-            texto = await self._page.evaluate(self.site["extract_js"], prev_count)
-            return (texto or "").strip()
+            return bool(await self._page.evaluate(_QUIET_JS, self._quiet_args))
         except Exception:
-            return ""
+            return False
 
     # ── Detección de generación activa ────────────────────────────────────────
 
     async def _is_generating(self) -> bool:
-        page = self._page
-        site = self.site
-        for sel in site["done_sel"].split(","):
-            sel = sel.strip()
-            if not sel: continue
-            try:
-                btn = await page.query_selector(sel)
-                if btn: return False
-            except Exception: continue
-        for sel in [
-            'button[aria-label="Stop"]', 'button[aria-label="Detener"]',
-            'button[aria-label="Stop generating"]', '[data-testid="stop-button"]',
-            '[class*="stop-button"]', '[class*="spinner"]',
-            '[class*="loading"]', '[class*="generating"]', '[class*="streaming"]',
-        ]:
-            try:
-                if await page.query_selector(sel): return True
-            except Exception: continue
-        return False
+        # Una sola llamada corta por nombre: la sonda (con sus selectores) ya
+        # está instalada en la página, no se reenvía ni se re-parsea
+        try:
+            return bool(await self._call_site_fn(self._generating_fn))
+        except Exception:
+            return False
 
     # ── Artefactos en iframes (Claude) ────────────────────────────────────────
 
     async def _extract_from_artifacts(self) -> str:
-        page  = self._page
-        parts = []
+        page = self._page
+        # Árbol de frames plano de Playwright (incluye los cross-origin, donde
+        # Claude suele poner los artefactos). Los about:blank no tienen nada.
         try:
-            for frame in page.frames:
-                if frame == page.main_frame: continue
-                try:
-                    content = await frame.evaluate("""
-                        () => {
-                          const body = document.body;
-                          if (!body) return '';
-                          return body.innerText || body.textContent || '';
-                        }
-                    """)
-                    content = (content or "").strip()
-                    if content and len(content) > 30:
-                        parts.append(content)
-                except Exception:
-                    pass
+            frames = [f for f in page.frames
+                      if f != page.main_frame and f.url not in ("", "about:blank")]
         except Exception:
-            pass
+            return ""
+        # Todos los frames a la vez: la latencia es la del más lento, no la suma
+        cache    = self._artifact_cache
+        contents = await asyncio.gather(
+            *(frame.evaluate(_FRAME_TEXT_JS, cache.get(frame, (None, ""))[0])
+              for frame in frames),
+            return_exceptions=True,
+        )
+        parts = []
+        for frame, content in zip(frames, contents):
+            if isinstance(content, BaseException):
+                continue
+            h, content = content
+            if content is None:
+                # Mismo hash que la lectura anterior de este turno: reutilizar
+                content = cache[frame][1]
+            else:
+                cache[frame] = (h, content)
+            content = (content or "").strip()
+            if content and len(content) > 30:
+                parts.append(content)
         return "\n\n".join(parts) if parts else ""
 
     # ══════════════════════════════════════════════════════════════════════════
@@ -587,102 +1265,187 @@ class BrowserSession:
     #  · Log de diagnóstico mejorado.
     # ══════════════════════════════════════════════════════════════════════════
 
+    async def _wait_new_message(self, prev_count: int, timeout: float):
+        """
+        Espera a que haya más de prev_count mensajes del asistente. Con el
+        binding, despierta con el aviso del MutationObserver (sin sondeo);
+        si no se pudo exponer, el predicado corre dentro de la página.
+        """
+        if not self._has_binding:
+            try:
+                await self._page.wait_for_function(
+                    self._new_msg_pred, arg=prev_count, timeout=timeout * 1000,
+                )
+            except Exception:
+                pass
+            return
+
+        loop     = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._msg_count <= prev_count:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            self._msg_event.clear()
+            try:
+                # Como mucho HEARTBEAT_S por espera: un aviso perdido no
+                # consume todo el plazo, se re-cuenta y se vuelve a esperar
+                await asyncio.wait_for(self._msg_event.wait(),
+                                       min(remaining, HEARTBEAT_S))
+            except asyncio.TimeoutError:
+                count = await self._count_responses()
+                if count > self._msg_count:
+                    self._msg_count = count
+
     async def _wait_for_response(self, max_wait: int = 0,
                                   prev_count: int = 0) -> str:
         if max_wait == 0:
             max_wait = 360 if self.site_key == "claude" else 180
 
-        start         = time.time()
+        # Reloj monotónico del loop: inmune a saltos del reloj de pared
+        loop          = asyncio.get_running_loop()
+        start         = loop.time()
+        deadline      = start + max_wait
         last_txt      = ""
-        stable        = 0
-        no_text_count = 0
+        last_len      = 0
+        quiet_tried   = False
+        no_text_since = None
+        warned        = False
         new_appeared  = False
-
-        await asyncio.sleep(3)
-
-        while time.time() - start < max_wait:
-            await asyncio.sleep(2)
-
-            try:
-                current = await self._extract_new_response(prev_count)
-            except Exception:
-                current = ""
+        quiet_backoff = False
+
+        # Espera por evento en vez de sleep fijo: resuelve en cuanto aparece
+        # un mensaje nuevo del asistente.
+        await self._wait_new_message(prev_count, max_wait)
+
+        # Backoff exponencial: mientras el texto crece no hace falta leer a
+        # cada instante → intervalo ×1.5 hasta POLL_MAX. Cuando el texto deja
+        # de cambiar se vuelve a POLL_MIN para notar pronto si se reanuda; el
+        # fin lo decide el tiempo sin cambios (STABLE_S), no los ticks. Sin
+        # texto, o generando sin cambios, el intervalo depende del tiempo sin
+        # cambios (ver POLL_IDLE_STEP_S). Los umbrales de "sin texto" también
+        # van por tiempo.
+        poll        = POLL_MIN
+        last_change = loop.time()
+        # Con el binding, un tick sin mutaciones reutiliza la lectura anterior
+        # sin evaluate; cada HEARTBEAT_S se lee igual por si se perdió un aviso.
+        count, last_read = prev_count, loop.time()
+        generating       = False
+
+        while loop.time() < deadline:
+            await asyncio.sleep(poll)
+
+            now = loop.time()
+            if (self._has_binding and not self._dom_dirty
+                    and now - last_read < HEARTBEAT_S):
+                # Sin mutaciones: texto y estado de generación siguen igual
+                current = last_txt
+            else:
+                count, current, generating = await self._poll_state(prev_count)
+                last_read = now
 
             # ── FIX 5e: Umbral bajado de > 40 a > 3 ─────────────────────────
             # Antes: respuestas cortas (comandos de 1 línea) nunca superaban
             # el umbral → se iban directo a no_text_count++ → timeout.
             if current and len(current) > 3:
-                no_text_count = 0
+                no_text_since = None
                 if not new_appeared:
                     new_appeared = True
-                    print(f"  {C.DIM}  Nueva respuesta detectada ({len(current)} chars)...{C.RESET}")
-
-                if current == last_txt:
-                    stable += 1
-                    if stable >= 3:
-                        if not await self._is_generating():
+                    log.info("    Nueva respuesta detectada (%d chars, %d mensaje(s) nuevos)...",
+                             len(current), count - prev_count, extra=LOG_DIM)
+
+                # Estabilidad por longitud: comparar el texto entero en cada
+                # tick es O(N) con respuestas largas; solo se confirma el
+                # contenido justo antes de dar la respuesta por terminada.
+                cur_len = len(current)
+                idle_s  = now - last_change
+                settled = idle_s >= STABLE_S
+                if cur_len == last_len and (not settled or current == last_txt):
+                    # Primer tick sin cambios: esperar el silencio del DOM en
+                    # la propia página (MutationObserver) en vez de sondear
+                    # hasta STABLE_S; si algo cambia, se sigue como siempre.
+                    if (not quiet_tried and not settled and not generating
+                            and current == last_txt):
+                        quiet_tried = True
+                        settled = await self._wait_dom_quiet()
+                    if settled:
+                        if not generating:
                             if self.site_key == "claude":
                                 try:
                                     artifact_text = await self._extract_from_artifacts()
                                     if artifact_text and len(artifact_text) > 30:
                                         current = current + "\n\n" + artifact_text
-                                        print(f"  {C.DIM}  📦 Artefacto iframe detectado ({len(artifact_text)} chars){C.RESET}")
+                                        log.info("    📦 Artefacto iframe detectado (%d chars)",
+                                                 len(artifact_text), extra=LOG_DIM)
                                 except Exception:
                                     pass
-                            print(f"  {C.DIM}  Respuesta lista ({len(current)} chars){C.RESET}")
+                            log.info("    Respuesta lista (%d chars)", len(current), extra=LOG_DIM)
                             return current
-                        stable = 0
+                        # Sigue generando sin texto nuevo: espaciar las lecturas
+                        quiet_backoff = True
+                        poll          = _idle_poll(idle_s)
+                    elif not quiet_backoff:
+                        # Sin pasarse del instante en que se cumple STABLE_S
+                        poll = max(0.05, min(POLL_MIN, STABLE_S - (loop.time() - last_change)))
                 else:
-                    stable   = 0
-                    last_txt = current
+                    quiet_tried   = False
+                    last_txt      = current
+                    last_len      = cur_len
+                    last_change   = now
+                    quiet_backoff = False
+                    poll          = min(poll * 1.5, POLL_MAX)
             else:
-                no_text_count += 1
-                if no_text_count == 8:
-                    elapsed = int(time.time() - start)
-                    print(f"  {C.YELLOW}  ⚠️  Aún esperando nueva respuesta... ({elapsed}s){C.RESET}")
-                # ── FIX 5e: Paciencia aumentada de >= 12 a >= 20 ─────────────
+                now  = loop.time()
+                poll = _idle_poll(now - last_change)
+                if no_text_since is None:
+                    no_text_since = now
+                if not warned and now - no_text_since >= NO_TEXT_WARN_S:
+                    warned = True
+                    log.info("    ⚠️  Aún esperando nueva respuesta... (%ds)", int(now - start),
+                             extra=LOG_WARN)
+                # ── FIX 5e: Paciencia aumentada ──────────────────────────────
                 # Más tiempo antes de devolver last_txt cuando es vacío.
-                if no_text_count >= 20 and last_txt:
-                    if not await self._is_generating():
+                if now - no_text_since >= NO_TEXT_GIVEUP_S and last_txt:
+                    if not generating:
                         return last_txt
 
         # ── Timeout ───────────────────────────────────────────────────────────
+        # Puede ser una sesión caducada: el próximo envío vuelve a comprobarla
+        self._chatgpt_logged_in = False
         txt = last_txt
         if txt:
-            if self.site_key == "claude" and await self._is_generating():
-                print(f"  {C.YELLOW}  ⚠️  Timeout ({max_wait}s) pero Claude sigue generando — "
-                      f"esperando hasta 120s más...{C.RESET}")
-                extra_waited = 0
-                while extra_waited < 120:
+            # La última lectura del bucle ya trae el estado: sin otra sonda
+            if self.site_key == "claude" and self._last_generating:
+                log.info("    ⚠️  Timeout (%ss) pero Claude sigue generando — "
+                         "esperando hasta 120s más...", max_wait, extra=LOG_WARN)
+                extra_start    = loop.time()
+                extra_deadline = extra_start + 120
+                while loop.time() < extra_deadline:
                     await asyncio.sleep(5)
-                    extra_waited += 5
-                    try:
-                        new_txt = await self._extract_new_response(prev_count)
-                        if new_txt and len(new_txt) > len(txt):
-                            txt = new_txt
-                    except Exception:
-                        pass
-                    if not await self._is_generating():
+                    # Texto y estado en un evaluate; el texto solo viaja por
+                    # CDP si su hash cambió (ver _POLL_JS)
+                    _, new_txt, generating = await self._poll_state(prev_count)
+                    if new_txt and len(new_txt) > len(txt):
+                        txt = new_txt
+                    if not generating:
                         await asyncio.sleep(2)
-                        try:
-                            final_txt = await self._extract_new_response(prev_count)
-                            if final_txt and len(final_txt) > len(txt):
-                                txt = final_txt
-                        except Exception:
-                            pass
-                        try:
-                            artifact_text = await self._extract_from_artifacts()
-                            if artifact_text and len(artifact_text) > 30:
-                                txt = txt + "\n\n" + artifact_text
-                        except Exception:
-                            pass
-                        print(f"  {C.GREEN}  ✅ Generación completada tras espera extra "
-                              f"({extra_waited}s) — {len(txt)} chars{C.RESET}")
+                        # Texto final y artefactos en paralelo: no dependen
+                        # uno del otro (ambos capturan sus propios errores)
+                        (_, final_txt, _), artifact_text = await asyncio.gather(
+                            self._poll_state(prev_count),
+                            self._extract_from_artifacts(),
+                        )
+                        if final_txt and len(final_txt) > len(txt):
+                            txt = final_txt
+                        if artifact_text and len(artifact_text) > 30:
+                            txt = txt + "\n\n" + artifact_text
+                        log.info("    ✅ Generación completada tras espera extra (%ds) — %d chars",
+                                 int(loop.time() - extra_start), len(txt), extra=LOG_OK)
                         return txt
-                print(f"  {C.YELLOW}  ⚠️  Espera extra agotada — devolviendo lo que hay "
-                      f"({len(txt)} chars){C.RESET}")
+                log.info("    ⚠️  Espera extra agotada — devolviendo lo que hay (%d chars)",
+                         len(txt), extra=LOG_WARN)
             else:
-                print(f"  {C.YELLOW}  ⚠️  Timeout — devolviendo ({len(txt)} chars){C.RESET}")
+                log.info("    ⚠️  Timeout — devolviendo (%d chars)", len(txt), extra=LOG_WARN)
             return txt
 
         return "No se pudo leer la respuesta."
@@ -691,132 +1454,158 @@ class BrowserSession:
     #  ENVIAR TEXTO AL INPUT
     # ══════════════════════════════════════════════════════════════════════════
 
+    async def _send_via_insert_text(self, el, text: str):
+        # Input.insertText de CDP (keyboard.insert_text): entra como una sola
+        # inserción de texto, sin portapapeles ni atajos de teclado
+        await el.evaluate(_FOCUS_SELECT_JS)
+        await self._page.keyboard.insert_text(text)
+
     async def _send_via_clipboard(self, el, text: str):
-        pyperclip.copy(text)
-        await el.click()
-        await asyncio.sleep(0.3)
-        await el.evaluate("el => el.focus()")
-        mod = "Meta" if sys.platform == "darwin" else "Control"
-        await el.press(f"{mod}+a")
-        await asyncio.sleep(0.2)
-        await el.press(f"{mod}+v")
-        await asyncio.sleep(0.5)
+        # Sin sleeps entre pasos: _submit_prompt espera a que el texto
+        # aparezca. El pegado sí va como tecla real: execCommand('paste')
+        # está bloqueado para las páginas web.
+        await asyncio.to_thread(_clipboard_copy, text)
+        await el.evaluate(_FOCUS_SELECT_JS)
+        await el.press(f"{_MOD_KEY}+v")
 
     async def _send_via_evaluate(self, el, text: str):
+        # Script constante y el texto como argumento: sin repr() del prompt ni
+        # un script distinto (a recompilar) por llamada
         try:
-            await el.evaluate(f"""
-                (el) => {{
-                    el.focus();
-                    if (el.isContentEditable) {{
-                        el.innerText = {repr(text)};
-                        el.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    }} else {{
-                        const ns = Object.getOwnPropertyDescriptor(
-                                       window.HTMLTextAreaElement.prototype, 'value')?.set;
-                        if (ns) {{
-                            ns.call(el, {repr(text)});
-                            el.dispatchEvent(new Event('input',  {{ bubbles: true }}));
-                            el.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                        }} else {{ el.value = {repr(text)}; }}
-                    }}
-                }})()
-            """)
-            await asyncio.sleep(1)
+            await el.evaluate(_SET_INPUT_TEXT_JS, text)
         except Exception as e:
-            print(f"  {C.RED}  _send_via_evaluate falló: {e}{C.RESET}")
+            log.info("    _send_via_evaluate falló: %s", e, extra=LOG_ERR)
 
     # ══════════════════════════════════════════════════════════════════════════
     #  SEND PROMPT — método principal público
     # ══════════════════════════════════════════════════════════════════════════
 
     async def send_prompt(self, prompt: str) -> str:
-        site = self.site
+        prev_count = await self._submit_prompt(prompt)
+        log.info("    Esperando respuesta de %s...", self.site["name"])
+        return await self._wait_for_response(prev_count=prev_count)
+
+    async def _ensure_on_site(self, wait_input: bool = True):
+        """
+        Idempotente: navega al sitio solo si la pestaña no está ya en él (tras
+        el login suele estarlo) y espera al input. Sin sleeps: wait_for_selector
+        espera justo lo que tarde la página.
+        """
+        page = self._page
+        if not self._on_site():
+            await page.goto(self._site_url, wait_until="domcontentloaded", timeout=30000)
+        if wait_input:
+            await page.wait_for_selector(self._input_sel, timeout=15000)
+
+    async def _submit_prompt(self, prompt: str) -> int:
+        """Pega y envía el prompt. Devuelve cuántas respuestas había antes."""
         page = self._page
 
-        site_host = re.sub(r"^https?://", "", site["url"]).split("/")[0].lower()
-        if site_host not in (page.url or "").lower():
-            await page.goto(site["url"], wait_until="domcontentloaded", timeout=30000)
-            await asyncio.sleep(3)
+        await self._ensure_on_site(wait_input=False)
 
         if (self.site_key == "chatgpt"
+                and not self._chatgpt_logged_in
                 and self._chatgpt_env_credentials_set()
                 and self._chatgpt_allow_automated_login()):
             try:
                 if await self._chatgpt_has_login_button():
                     await self.wait_for_login()
-                    await page.goto(site["url"], wait_until="domcontentloaded", timeout=30000)
-                    await asyncio.sleep(2)
+                    await self._ensure_on_site(wait_input=False)
             except Exception: pass
 
         try:
-            await page.wait_for_selector(site["input_sel"], timeout=15000)
+            await page.wait_for_selector(self._input_sel, timeout=15000)
         except Exception as e:
             if await self.needs_login(navigate_if_needed=False):
                 await self.wait_for_login()
-                await page.goto(site["url"], wait_until="domcontentloaded", timeout=30000)
-                await asyncio.sleep(2)
-                await page.wait_for_selector(site["input_sel"], timeout=15000)
+                await self._ensure_on_site()
             else:
-                print(f"  {C.RED}Error encontrando input: {e}{C.RESET}"); raise
-
-        prev_count = await self._count_responses()
-        print(f"    Respuestas previas en DOM: {prev_count}")
-
-        pyperclip.copy(prompt)
-        print(f"    Prompt copiado al portapapeles ({len(prompt)} chars)")
+                log.info("  Error encontrando input: %s", e, extra=LOG_ERR); raise
+        # Input visible sin pasar por login: la sesión está activa
+        if self.site_key == "chatgpt":
+            self._chatgpt_logged_in = True
+
+        # Conteo previo y handle del input son independientes: en paralelo,
+        # un round-trip CDP de espera en vez de dos seguidos
+        prev_count, input_el = await asyncio.gather(
+            self._count_responses(), self._input_element()
+        )
+        self._msg_count = prev_count
+        self._artifact_cache.clear()
+        self._poll_hash, self._poll_text = None, ""
+        self._last_generating = False
+        log.info("    Respuestas previas en DOM: %d", prev_count)
 
-        input_el = await _query_first(page, site["input_sel"])
         if not input_el:
             raise RuntimeError("No se encontró el elemento de input.")
 
-        await self._send_via_clipboard(input_el, prompt)
+        # Inserción directa primero; el portapapeles queda como respaldo
+        try:
+            await self._send_via_insert_text(input_el, prompt)
+            log.info("    Prompt insertado (%d chars)", len(prompt))
+        except Exception:
+            if _HAS_CLIPBOARD:
+                await self._send_via_clipboard(input_el, prompt)
+                log.info("    Prompt pegado desde el portapapeles (%d chars)", len(prompt))
+            else:
+                await self._send_via_evaluate(input_el, prompt)
 
         try:
-            val = await input_el.evaluate(
-                "el => el.isContentEditable ? el.innerText : el.value"
+            # Resuelve en cuanto el input tiene al menos la mitad del prompt
+            # (MutationObserver + evento input) en vez de un sleep fijo
+            filled = await input_el.evaluate(
+                _INPUT_FILLED_JS, [len(prompt) * 0.5, PASTE_WAIT_MS]
             )
-            if not val or len(val.strip()) < len(prompt) * 0.5:
-                print(f"  {C.YELLOW}  ⚠️  Clipboard no funcionó, usando evaluate...{C.RESET}")
+            if not filled:
+                log.info("    ⚠️  El texto no llegó al input, usando evaluate...", extra=LOG_WARN)
                 await self._send_via_evaluate(input_el, prompt)
         except Exception:
             pass
 
-        await asyncio.sleep(0.5)
-        send_el = await _query_first(page, site["send_sel"])
+        # Esperar a que el botón se habilite en vez de un sleep(0.5) a ciegas,
+        # con el mismo tope: si el sitio no tiene ese botón, Enter sin demora
+        try:
+            send_el = await page.wait_for_selector(self._send_ready, state="visible",
+                                                   timeout=SEND_READY_MS)
+        except Exception:
+            send_el = None
         if send_el:
             await send_el.click()
         else:
-            mod = "Meta" if sys.platform == "darwin" else "Control"
             await input_el.press("Enter")
 
-        print(f"    Esperando respuesta de {site['name']}...")
-        return await self._wait_for_response(prev_count=prev_count)
+        return prev_count
 
 
 # ══════════════════════════════════════════════════════════════════════════════
-#  SHUTDOWN
+#  POOL DE SESIONES
 # ══════════════════════════════════════════════════════════════════════════════
 
-_active_sessions: dict[str, BrowserSession] = {}
-
-def get_or_create_session(site_key: str) -> BrowserSession:
-    if site_key not in _active_sessions:
-        _active_sessions[site_key] = BrowserSession(site_key)
-    return _active_sessions[site_key]
-
-def shutdown_ai_scraper_runtime():
-    async def _close_all():
-        for sess in _active_sessions.values():
-            try:
-                await sess.close()
-            except Exception:
-                pass
-        _active_sessions.clear()
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.create_task(_close_all())
-        else:
-            loop.run_until_complete(_close_all())
-    except Exception:
-        pass
\ No newline at end of file
+# Pool de sesiones del proceso, una por sitio: arrancar Playwright + contexto
+# cuesta 1-2 s y cientos de MB, así que una sesión iniciada se reutiliza en
+# todas las llamadas y solo se cierra al salir (o si queda inservible). El
+# apagado vive en core.ai_scraper, dueño del loop donde corren las sesiones.
+_SESSION_POOL: dict[str, BrowserSession] = {}
+
+# Comprobar-e-insertar bajo lock: dos llamadas concurrentes al mismo sitio no
+# deben lanzar dos navegadores (uno quedaría huérfano fuera del pool)
+_POOL_LOCK = threading.Lock()
+_START_LOCKS: dict[str, asyncio.Lock] = {}
+
+def _pooled(site_key: str) -> BrowserSession:
+    with _POOL_LOCK:
+        session = _SESSION_POOL.get(site_key)
+        if session is None or session._closing:
+            session = _SESSION_POOL[site_key] = BrowserSession(site_key)
+        return session
+
+async def get_session(site_key: str) -> BrowserSession:
+    """Devuelve la sesión del pool ya arrancada; la crea la primera vez."""
+    with _POOL_LOCK:
+        lock = _START_LOCKS.get(site_key)
+        if lock is None:
+            lock = _START_LOCKS[site_key] = asyncio.Lock()
+    async with lock:
+        session = _pooled(site_key)
+        await session.start()
+        return session
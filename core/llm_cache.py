@@ -0,0 +1,81 @@
+"""
+core/llm_cache.py — Caché en disco de respuestas de las IAs web.
+
+Cada prompt se normaliza (espacios colapsados) y se indexa por el SHA-256 del
+sitio + prompt (la respuesta de una IA no sirve a quien eligió otra):
+  data/llm_cache/<sha256>.json  →  {"ts": epoch, "site": "claude", "resp": "..."}
+
+Un acierto evita el viaje completo por el navegador (decenas de segundos).
+Desactivar con SONNY_NO_CACHE=1. TTL configurable con SONNY_LLM_CACHE_TTL_DAYS.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).parent.parent / "data" / "llm_cache"
+
+TRUE_VALUES = {"1", "true", "yes", "si", "sí"}
+_WS_RE      = re.compile(r"\s+")
+
+
+def ttl_seconds() -> float:
+    try:
+        ttl_days = float((os.environ.get("SONNY_LLM_CACHE_TTL_DAYS") or "7").strip())
+    except ValueError:
+        ttl_days = 7.0
+    return ttl_days * 86400
+
+
+def cache_enabled() -> bool:
+    return (os.environ.get("SONNY_NO_CACHE") or "").strip().lower() not in TRUE_VALUES
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WS_RE.sub(" ", (prompt or "").strip())
+
+
+def prompt_key(prompt: str, site: str = "") -> str:
+    raw = f"{site}\0{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _path_for(prompt: str, site: str = "") -> Path:
+    return CACHE_DIR / f"{prompt_key(prompt, site)}.json"
+
+
+def cache_get(prompt: str, site: str = "") -> dict | None:
+    """
+    Devuelve {"ts", "site", "resp"} si hay una entrada vigente para el prompt,
+    o None si no existe, expiró o la caché está desactivada.
+    """
+    if not cache_enabled():
+        return None
+    path = _path_for(prompt, site)
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or not entry.get("resp"):
+        return None
+    if time.time() - float(entry.get("ts") or 0) > ttl_seconds():
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        return None
+    return entry
+
+
+def cache_set(prompt: str, response: str, site: str = "") -> None:
+    """Guarda la respuesta del prompt. Nunca lanza: la caché es opcional."""
+    if not cache_enabled() or not response:
+        return
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        entry = {"ts": time.time(), "site": site, "resp": response}
+        _path_for(prompt, site).write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+    except Exception:
+        pass
@@ -42,6 +42,7 @@ v11.5 — FIX ETIQUETAS DE LENGUAJE CONCATENADAS (mantenido).
 import os, subprocess, re, shutil, json, hashlib
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from core.ai_scraper  import ask_ai_multiturn
 from core.browser     import AI_SITES
 from core.code_parser import (
@@ -514,9 +515,15 @@ def _show_error_block(title: str, error: str):
 #   CONSULTA A LA IA
 # ═══════════════════════════════════════════════════════════════════
 
-def _ask_web(prompt: str, preferred_site: str, objetivo: str) -> str:
+def _ask_web(prompt: str, preferred_site: str, objetivo: str,
+             use_cache: bool = True, semantic_key: tuple | None = None) -> str:
+    # use_cache=False en correcciones y reintentos: la respuesta guardada es
+    # justo la que acaba de fallar. semantic_key = (plantilla, parte variable):
+    # sin ella el prompt solo usa la caché exacta
     try:
-        _, [resp] = ask_ai_multiturn([prompt], preferred_site, objetivo)
+        _, [resp] = ask_ai_multiturn([prompt], preferred_site, objetivo,
+                                     use_cache=use_cache,
+                                     semantic_keys=[semantic_key])
         return resp or ""
     except Exception as e:
         log_error(preferred_site or "web", str(e))
@@ -599,6 +606,7 @@ def _scan_project(project_dir: Path) -> tuple:
 #   REGLAS DE ARQUITECTURA ANGULAR EN PROMPTS
 # ═══════════════════════════════════════════════════════════════════
 
+@lru_cache(maxsize=32)
 def _ng_arch_rules(ng_major: int) -> str:
     if ng_major >= 17:
         return f"""
@@ -620,22 +628,34 @@ def _ng_arch_rules(ng_major: int) -> str:
 #   PROMPTS
 # ═══════════════════════════════════════════════════════════════════
 
+# Orden de los prompts: bloque estático primero y lo variable (objetivo) al
+# final, para maximizar el prefijo común que el proveedor puede cachear.
+# Los prompts deterministas se memoizan: los reintentos reconstruyen el mismo
+# texto varias veces. verified_tools (dict) se reduce antes a un str hashable.
+
+def _tools_str(verified_tools: dict) -> str:
+    return ", ".join(f"{n} {i['version']}" for n,i in verified_tools.items() if i["ok"])
+
+@lru_cache(maxsize=256)
 def _p1_prereqs(objetivo: str) -> str:
     return (
-        f"Necesito {objetivo.rstrip('. ')}. "
         f"Dime ÚNICAMENTE qué debo tener instalado. "
-        f"Solo la lista de requisitos, sin tutoriales."
+        f"Solo la lista de requisitos, sin tutoriales.\n\n"
+        f"Necesito {objetivo.rstrip('. ')}."
     )
 
 def _p2_steps_create(objetivo: str, verified_tools: dict) -> str:
-    tools_str = ", ".join(f"{n} {i['version']}" for n,i in verified_tools.items() if i["ok"])
+    return _p2_steps_create_cached(objetivo, _tools_str(verified_tools))
+
+@lru_cache(maxsize=256)
+def _p2_steps_create_cached(objetivo: str, tools_str: str) -> str:
     return (
-        f"Ya tengo: {tools_str}. Necesito {objetivo}. "
-        f"Dame SOLO el comando ng new. NO incluyas --skip-install. Solo el comando."
+        f"Dame SOLO el comando ng new. NO incluyas --skip-install. Solo el comando.\n\n"
+        f"Ya tengo: {tools_str}. Necesito {objetivo}."
     )
 
 def _p_fix_ng_new(objetivo: str, cmd: str, error: str, verified_tools: dict) -> str:
-    tools_str = ", ".join(f"{n} {i['version']}" for n,i in verified_tools.items() if i["ok"])
+    tools_str = _tools_str(verified_tools)
     return (
         f"Comando fallido: '{cmd}'\nTengo: {tools_str}\nError: {error[:600]}\n\n"
         f"Dame SOLO el comando ng new corregido. Sin --skip-install."
@@ -643,7 +663,7 @@ def _p_fix_ng_new(objetivo: str, cmd: str, error: str, verified_tools: dict) ->
 
 def _p2_steps(objetivo: str, verified_tools: dict, ng_major: int=17,
               tree: str="", key_files: dict=None, key_config: dict=None) -> str:
-    tools_str = ", ".join(f"{n} {i['version']}" for n,i in verified_tools.items() if i["ok"])
+    tools_str = _tools_str(verified_tools)
     files_ctx = ""
     if key_files:
         for rel,content in list(key_files.items())[:8]:
@@ -655,14 +675,7 @@ def _p2_steps(objetivo: str, verified_tools: dict, ng_major: int=17,
             config_ctx += f"\n=== {rel} (COMPLETO) ===\n{content}\n"
     arch = _ng_arch_rules(ng_major)
     return (
-        f"Tengo: {tools_str}. Angular v{ng_major}.\n"
-        f"Proyecto ya creado con ng new + npm install completado.\n\n"
-        f"{arch}\n"
-        f"ESTRUCTURA REAL DEL PROYECTO:\n```\n{tree}\n```\n\n"
-        f"ARCHIVOS DE CONFIGURACIÓN ACTUALES (COMPLETOS):\n{config_ctx}\n"
-        f"OTROS ARCHIVOS CLAVE (extracto):\n{files_ctx}\n"
-        f"TAREA: {objetivo}\n\n"
-        f"Dame los pasos para modificar los archivos y lograr la tarea.\n"
+        f"Dame los pasos para modificar los archivos y lograr la TAREA indicada al final.\n"
         f"USA EXACTAMENTE este formato:\n\n"
         f"PASO 1: descripción corta\n"
         f"CMD: comando exacto (o NINGUNO)\n"
@@ -674,12 +687,19 @@ def _p2_steps(objetivo: str, verified_tools: dict, ng_major: int=17,
         f"3. Cada FILE DEBE tener el contenido COMPLETO\n"
         f"4. El contenido empieza DIRECTAMENTE con código (sin 'Código:', backticks sueltos ni frases)\n"
         f"5. NO crear app.module.ts en Angular 17+\n"
-        f"6. Solo pasos. Sin introducciones ni conclusiones."
+        f"6. Solo pasos. Sin introducciones ni conclusiones.\n\n"
+        f"Proyecto ya creado con ng new + npm install completado.\n"
+        f"Tengo: {tools_str}. Angular v{ng_major}.\n\n"
+        f"{arch}\n"
+        f"ESTRUCTURA REAL DEL PROYECTO:\n```\n{tree}\n```\n\n"
+        f"ARCHIVOS DE CONFIGURACIÓN ACTUALES (COMPLETOS):\n{config_ctx}\n"
+        f"OTROS ARCHIVOS CLAVE (extracto):\n{files_ctx}\n"
+        f"TAREA: {objetivo}"
     )
 
 def _p_fix_step(objetivo: str, paso_desc: str, cmd_ej: str,
                 error: str, verified_tools: dict, ng_major: int=17) -> str:
-    tools_str = ", ".join(f"{n} {i['version']}" for n,i in verified_tools.items() if i["ok"])
+    tools_str = _tools_str(verified_tools)
     arch = _ng_arch_rules(ng_major)
     return (
         f"Estoy creando: {objetivo}\n{arch}\n"
@@ -873,6 +893,19 @@ def _parse_plan(response: str, project_dir: Path | None = None) -> list:
         if step.get("cmd") or step.get("files"): result.append(step)
     return result
 
+# Clasificación de línea PASO/CMD/FILE con UNA sola ejecución de regex
+# (antes: hasta cinco re.match por línea).
+_STRUCT_LINE_RE = re.compile(
+    r'^(?:(?P<paso>PASO\s+\d+\s*[:\-])|(?P<kind>CMD|FILE)\s*:)\s*(?P<rest>.*)',
+    re.IGNORECASE,
+)
+
+def _classify_line(line: str) -> tuple:
+    """Devuelve ("PASO" | "CMD" | "FILE" | None, resto) para una línea ya strip()eada."""
+    m = _STRUCT_LINE_RE.match(line)
+    if not m: return None, ""
+    return ("PASO" if m.group("paso") else m.group("kind").upper()), m.group("rest")
+
 def _parse_structured(response: str) -> list:
     """
     Parser estructurado PASO/CMD/FILE.
@@ -888,23 +921,19 @@ def _parse_structured(response: str) -> list:
 
     steps, lines, i = [], response.splitlines(), 0
     while i < len(lines):
-        m = re.match(r'^PASO\s+\d+\s*[:\-]\s*(.+)', lines[i].strip(), re.IGNORECASE)
-        if not m: i+=1; continue
-        step = {"desc": m.group(1).strip(), "cmd": None, "files": [], "_is_serve": False}
+        kind, rest = _classify_line(lines[i].strip())
+        if kind != "PASO" or not rest: i+=1; continue
+        step = {"desc": rest, "cmd": None, "files": [], "_is_serve": False}
         i += 1
         while i < len(lines):
-            l = lines[i].strip()
-            if re.match(r'^PASO\s+\d+\s*[:\-]', l, re.IGNORECASE): break
-            mc = re.match(r'^CMD\s*:\s*(.+)', l, re.IGNORECASE)
-            if mc:
-                v = mc.group(1).strip()
-                if v.upper() not in ("NINGUNO","NONE","N/A",""):
-                    v = _strip_concat_lang(v)
-                    step["cmd"] = v
+            kind, rest = _classify_line(lines[i].strip())
+            if kind == "PASO": break
+            if kind == "CMD" and rest:
+                if rest.upper() not in ("NINGUNO","NONE","N/A",""):
+                    step["cmd"] = _strip_concat_lang(rest)
                 i+=1; continue
-            mf = re.match(r'^FILE\s*:\s*(.+)', l, re.IGNORECASE)
-            if mf:
-                fpath = mf.group(1).strip(); i+=1; cl = []
+            if kind == "FILE" and rest:
+                fpath = rest; i+=1; cl = []
                 if i < len(lines) and lines[i].strip() == "": i+=1
                 while i < len(lines) and _is_bare_lang_label(lines[i]): i+=1
                 uses_backticks = i < len(lines) and lines[i].strip().startswith("```")
@@ -913,10 +942,9 @@ def _parse_structured(response: str) -> list:
                 while i < len(lines):
                     cur = lines[i]; curs = cur.strip()
                     if uses_backticks and curs.startswith("```"): i+=1; break
-                    if re.match(r'^PASO\s+\d+\s*[:\-]', curs, re.IGNORECASE): break
-                    if not uses_backticks:
-                        if re.match(r'^FILE\s*:', curs, re.IGNORECASE): break
-                        if re.match(r'^CMD\s*:', curs, re.IGNORECASE): break
+                    ckind = _classify_line(curs)[0]
+                    if ckind == "PASO": break
+                    if not uses_backticks and ckind: break
                     if first_content_line and cur.strip():
                         fixed = _strip_concat_lang(cur)
                         if fixed != cur.strip():
@@ -974,12 +1002,13 @@ def _parse_natural(response: str) -> list:
                 if not cur["cmd"]: cur["cmd"] = clean
         fm = re.match(r'^```(\w*)', line)
         if fm:
-            lang = fm.group(1).lower(); cl = []
-            while i < len(lines):
-                if lines[i].strip().startswith("```"): i+=1; break
-                cl.append(lines[i]); i+=1
+            lang = fm.group(1).lower()
+            # Buscar el cierre y cortar con un slice (sin append línea a línea)
+            j, n = i, len(lines)
+            while j < n and not lines[j].lstrip().startswith("```"): j+=1
             # v12.1: normalizar contenido del bloque
-            raw_content = "\n".join(cl).strip()
+            raw_content = "\n".join(lines[i:j]).strip()
+            i = j + 1
             content = normalize_newlines(raw_content)
             if not content: continue
             fpath = last_path or _LANG_DEF.get(lang,"")
@@ -1082,7 +1111,8 @@ def run_orchestrator(objetivo: str, preferred_site: str=None) -> bool:
     # ── TURNO 1 ─────────────────────────────────────────────────────
     P(f"  {C.BOLD}{C.MAGENTA}━━━ TURNO 1 → {site_name}: herramientas ━━━{C.RESET}\n")
     P(f"  {C.DIM}  Abriendo navegador...{C.RESET}\n")
-    resp_prereq = _ask_web(_p1_prereqs(objetivo), preferred_site, objetivo)
+    resp_prereq = _ask_web(_p1_prereqs(objetivo), preferred_site, objetivo,
+                           semantic_key=("p1_prereqs", objetivo))
     if not resp_prereq:
         P(f"  {C.RED}  ❌ Sin respuesta.{C.RESET}")
         try: log_session_end(objetivo, success=False, total_rounds=0, ng_major=0)
@@ -1127,7 +1157,9 @@ def run_orchestrator(objetivo: str, preferred_site: str=None) -> bool:
 
     _FAILED_RESPONSES = {"no se pudo leer la respuesta", "no se pudo leer", ""}
 
-    resp_create = _ask_web(_p2_steps_create(objetivo, verified_tools), preferred_site, objetivo)
+    resp_create = _ask_web(_p2_steps_create(objetivo, verified_tools), preferred_site, objetivo,
+                           semantic_key=("p2_steps_create",
+                                         f"{objetivo}\n{_tools_str(verified_tools)}"))
     if not resp_create:
         P(f"  {C.RED}  ❌ Sin respuesta Turno 2.{C.RESET}")
         return False
@@ -1141,7 +1173,8 @@ def run_orchestrator(objetivo: str, preferred_site: str=None) -> bool:
     # y el browser no la capturó a tiempo. Reintentamos UNA vez con el mismo prompt.
     if not create_cmd and resp_create.strip().lower() in _FAILED_RESPONSES:
         P(f"  {C.YELLOW}  ⚠️  Respuesta ilegible — reintentando Turno 2...{C.RESET}\n")
-        resp_create2 = _ask_web(_p2_steps_create(objetivo, verified_tools), preferred_site, objetivo)
+        resp_create2 = _ask_web(_p2_steps_create(objetivo, verified_tools), preferred_site, objetivo,
+                                use_cache=False)
         if resp_create2 and resp_create2.strip().lower() not in _FAILED_RESPONSES:
             P(f"  {C.DIM}    Reintento: {resp_create2.strip()[:100]}{C.RESET}\n")
             create_cmd = _extract_ng_new(resp_create2)
@@ -1170,7 +1203,8 @@ def run_orchestrator(objetivo: str, preferred_site: str=None) -> bool:
                 P(f"  {C.RED}  ❌ ng new falló {MAX_FIX_ATTEMPTS} veces.{C.RESET}")
                 return False
             P(f"  {C.YELLOW}  Consultando {site_name} para corregir...{C.RESET}\n")
-            fix_resp = _ask_web(_p_fix_ng_new(objetivo, create_cmd, err, verified_tools), preferred_site, objetivo)
+            fix_resp = _ask_web(_p_fix_ng_new(objetivo, create_cmd, err, verified_tools), preferred_site, objetivo,
+                                use_cache=False)
             if fix_resp:
                 fix_resp = normalize_newlines(fix_resp)
                 for line in fix_resp.splitlines():
@@ -1255,7 +1289,7 @@ def run_orchestrator(objetivo: str, preferred_site: str=None) -> bool:
                 P(f"\n  {C.YELLOW}  ⚠️  Error paso {step_num}. Consultando {site_name} (intento {attempt})...{C.RESET}\n")
                 ejecutado = step.get("cmd") or str([f["path"] for f in step.get("files",[])])
                 fix_p = _p_fix_step(objetivo, step["desc"], ejecutado, error_out, verified_tools, ng_major)
-                fix_resp = _ask_web(fix_p, preferred_site, objetivo)
+                fix_resp = _ask_web(fix_p, preferred_site, objetivo, use_cache=False)
                 if not fix_resp:
                     P(f"  {C.RED}  ❌ Sin respuesta de la IA. Reintentando...{C.RESET}")
                     continue
@@ -1264,7 +1298,7 @@ def run_orchestrator(objetivo: str, preferred_site: str=None) -> bool:
                     P(f"  {C.YELLOW}  ⚠️  Sin pasos. Reintentando con formato explícito...{C.RESET}")
                     fix_resp2 = _ask_web(
                         _p_fix_serve_force_format(objetivo, error_out, project_dir, "", ng_major),
-                        preferred_site, objetivo
+                        preferred_site, objetivo, use_cache=False
                     )
                     if fix_resp2:
                         fix_steps = [s for s in _parse_plan(fix_resp2, project_dir) if not s.get("_is_serve")]
@@ -1426,7 +1460,7 @@ def _serve_and_fix(project_dir: Path, objetivo: str, preferred_site: str,
             else:
                 fix_prompt = _p_fix_serve(objetivo, errors, project_dir, tools_str, ng_major)
 
-            fix_resp = _ask_web(fix_prompt, preferred_site, objetivo)
+            fix_resp = _ask_web(fix_prompt, preferred_site, objetivo, use_cache=False)
             if not fix_resp:
                 P(f"  {C.RED}  ❌ Sin respuesta de la IA. Reintentando en próxima ronda...{C.RESET}")
                 continue
@@ -1443,7 +1477,7 @@ def _serve_and_fix(project_dir: Path, objetivo: str, preferred_site: str,
                 P(f"  {C.YELLOW}  ⚠️  No se encontraron pasos — reintentando con formato explícito...{C.RESET}")
                 fix_resp2 = _ask_web(
                     _p_fix_serve_force_format(objetivo, errors, project_dir, tools_str, ng_major),
-                    preferred_site, objetivo
+                    preferred_site, objetivo, use_cache=False
                 )
                 if fix_resp2:
                     P(f"  {C.CYAN}  💬 {site_name} — respuesta formato forzado:{C.RESET}")
@@ -0,0 +1,143 @@
+"""
+core/semantic_cache.py — Caché semántica (embeddings) delante de las IAs web.
+
+Complementa a core/llm_cache.py: cuando el hash exacto falla, busca un prompt
+ya respondido con significado equivalente ("crea una app Angular con rutas" vs
+"haz proyecto angular con router") y reutiliza su respuesta.
+
+  · Embeddings locales con sentence-transformers (all-MiniLM-L6-v2).
+  · Índice FAISS IndexFlatIP sobre vectores normalizados → producto = coseno.
+  · Persistencia: data/semantic_cache/index.faiss + entries.json
+
+No se embebe el prompt entero: en un prompt de plantilla el texto fijo domina
+el embedding y dos objetivos distintos darían un falso acierto. El llamador
+pasa solo la parte variable (objetivo, herramientas…) y un `kind` que
+identifica la plantilla; solo se compara con entradas del mismo kind. El
+texto tiene que caber entero en la ventana del modelo (256 word pieces).
+
+Dependencias OPCIONALES (pip install sentence-transformers faiss-cpu).
+Se activa con SONNY_SEMANTIC_CACHE=1; SONNY_NO_CACHE=1 la desactiva igual que
+a la caché exacta. Si faltan las dependencias, queda inactiva sin error.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from core.llm_cache import TRUE_VALUES, cache_enabled, normalize_prompt, ttl_seconds
+
+CACHE_DIR     = Path(__file__).parent.parent / "data" / "semantic_cache"
+_INDEX_FILE   = CACHE_DIR / "index.faiss"
+_ENTRIES_FILE = CACHE_DIR / "entries.json"
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+THRESHOLD  = 0.92
+
+_LOCK  = threading.Lock()
+_STATE = {"model": None, "index": None, "entries": None, "failed": False}
+
+
+def is_configured() -> bool:
+    """Chequeo barato (solo entorno) — no carga el modelo."""
+    return cache_enabled() and \
+        (os.environ.get("SONNY_SEMANTIC_CACHE") or "").strip().lower() in TRUE_VALUES
+
+
+def _load() -> bool:
+    """Carga perezosa de modelo + índice. Devuelve False si no hay dependencias."""
+    if _STATE["model"] is not None:
+        return True
+    if _STATE["failed"]:
+        return False
+    try:
+        import faiss
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        _STATE["failed"] = True
+        return False
+
+    try:
+        model   = SentenceTransformer(MODEL_NAME)
+        entries = []
+        if _INDEX_FILE.exists() and _ENTRIES_FILE.exists():
+            index   = faiss.read_index(str(_INDEX_FILE))
+            entries = json.loads(_ENTRIES_FILE.read_text(encoding="utf-8"))
+            if index.ntotal != len(entries):
+                index, entries = None, []
+        else:
+            index = None
+        if index is None:
+            index = faiss.IndexFlatIP(model.get_sentence_embedding_dimension())
+    except Exception:
+        _STATE["failed"] = True
+        return False
+
+    _STATE.update(model=model, index=index, entries=entries)
+    return True
+
+
+def _fits_window(text: str) -> bool:
+    """True si el texto entero entra en la ventana del modelo (sin truncar)."""
+    model = _STATE["model"]
+    try:
+        n_tokens = len(model.tokenizer(normalize_prompt(text))["input_ids"])
+    except Exception:
+        return False
+    return n_tokens <= model.max_seq_length
+
+
+def _embed(text: str):
+    vec = _STATE["model"].encode([normalize_prompt(text)], normalize_embeddings=True)
+    return vec.astype("float32")
+
+
+def semantic_get(text: str, site: str = "", kind: str = "") -> dict | None:
+    """
+    text: parte variable del prompt; kind: plantilla de la que sale.
+    Devuelve {"ts", "site", "kind", "resp", "prompt", "score"} de la entrada
+    más parecida del mismo kind (y del sitio indicado, si lo hay) si el
+    coseno ≥ THRESHOLD y no expiró; si no, None.
+    """
+    if not is_configured():
+        return None
+    with _LOCK:
+        if not _load() or _STATE["index"].ntotal == 0 or not _fits_window(text):
+            return None
+        try:
+            scores, ids = _STATE["index"].search(_embed(text), min(_STATE["index"].ntotal, 8))
+        except Exception:
+            return None
+        for score, idx in zip(scores[0], ids[0]):
+            score, idx = float(score), int(idx)
+            if idx < 0 or score < THRESHOLD:
+                break
+            entry = _STATE["entries"][idx]
+            if entry.get("kind", "") != kind or (site and entry.get("site") != site):
+                continue
+            if time.time() - float(entry.get("ts") or 0) > ttl_seconds():
+                continue
+            return {**entry, "score": score}
+        return None
+
+
+def semantic_set(text: str, response: str, site: str = "", kind: str = "") -> None:
+    """Añade el par (embedding de text, respuesta) al índice y lo persiste. Nunca lanza."""
+    if not is_configured() or not response:
+        return
+    with _LOCK:
+        if not _load() or not _fits_window(text):
+            return
+        try:
+            import faiss
+            _STATE["index"].add(_embed(text))
+            _STATE["entries"].append({
+                "ts": time.time(), "site": site, "kind": kind,
+                "prompt": normalize_prompt(text), "resp": response,
+            })
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            faiss.write_index(_STATE["index"], str(_INDEX_FILE))
+            _ENTRIES_FILE.write_text(json.dumps(_STATE["entries"], ensure_ascii=False),
+                                     encoding="utf-8")
+        except Exception:
+            pass